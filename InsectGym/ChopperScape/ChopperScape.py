@@ -3,13 +3,98 @@ import cv2
 import matplotlib.pyplot as plt
 import PIL.Image as Image
 import gym
+import os
 import random
 
 from gym import Env, spaces
+from InsectGym.Utils.UniformBox import UniformBox
 import time
 
 font = cv2.FONT_HERSHEY_COMPLEX_SMALL
 
+# (file name, width, height, mode) -> icon, loaded once from the package directory and shared by every entity
+sprite_cache = {}
+
+
+def load_sprite(file_name, width, height, mode='canvas'):
+    """
+    the icon of file_name resized to (width, height) as a read-only array: BGR floats in [0, 1] for the 'canvas',
+    uint8 RGB for 'rgb' and uint8 luminance of shape (height, width) for 'gray'
+    """
+    key = (file_name, width, height, mode)
+    if key not in sprite_cache:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+        image = cv2.imread(path)
+        assert image is not None, "cannot read the sprite " + path
+        if mode == 'canvas':
+            icon = cv2.resize(image.astype(np.float32) / 255, (width, height))
+        else:
+            # averaged over the source pixels, the downsampled observations are only a few pixels per icon
+            icon = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+            icon = cv2.cvtColor(icon, cv2.COLOR_BGR2GRAY if mode == 'gray' else cv2.COLOR_BGR2RGB)
+        icon.setflags(write=False)
+        sprite_cache[key] = icon
+    return sprite_cache[key]
+
+
+chopper_size = 64
+
+
+class SpriteCanvas(object):
+    """
+    A frame buffer of size (height, width) the playing field of field_size is drawn on, scaled, in one of the modes
+    of load_sprite. The buffer is allocated when it is first drawn on and then reused: each frame only the
+    rectangles drawn over in the previous one are erased, which gives the same image as redrawing everything over
+    the (white) background.
+    """
+
+    def __init__(self, size, field_size, mode='canvas'):
+        self.height, self.width = size
+        self.scale_y = size[0] / field_size[0]
+        self.scale_x = size[1] / field_size[1]
+        self.mode = mode
+        self.shape = (self.height, self.width) if mode == 'gray' else (self.height, self.width, 3)
+        self.dtype = np.float32 if mode == 'canvas' else np.uint8
+        self.background = 1 if mode == 'canvas' else 255
+        self.buffer = None
+        # Areas of the buffer drawn over since the last erase, as (y, x, h, w)
+        self.dirty_rects = []
+
+    def clear(self):
+        if self.buffer is None:
+            self.buffer = np.empty(self.shape, dtype=self.dtype)
+        self.buffer[:] = self.background
+        self.dirty_rects = []
+
+    def erase(self):
+        if self.buffer is None:
+            self.clear()
+        for y, x, h, w in self.dirty_rects:
+            self.buffer[y:y + h, x:x + w] = self.background
+        self.dirty_rects = []
+
+    def draw_sprite(self, file_name, x, y, width, height):
+        """draw the icon of an element of size (width, height) at (x, y) of the field"""
+        x0 = int(x * self.scale_x)
+        y0 = int(y * self.scale_y)
+        w = max(int((x + width) * self.scale_x) - x0, 1)
+        h = max(int((y + height) * self.scale_y) - y0, 1)
+        x0 = min(x0, self.width - w)
+        y0 = min(y0, self.height - h)
+        self.buffer[y0:y0 + h, x0:x0 + w] = load_sprite(file_name, w, h, self.mode)
+        self.dirty_rects.append((y0, x0, h, w))
+
+    def draw_text(self, text, origin):
+        (text_w, text_h), baseline = cv2.getTextSize(text, font, 0.8, 1)
+        self.dirty_rects.append((max(origin[1] - text_h - 2, 0), origin[0] - 2, text_h + baseline + 4, text_w + 4))
+        cv2.putText(self.buffer, text, origin, font, 0.8, (0, 0, 0), 1, cv2.LINE_AA)
+
+    def draw_bar(self, fraction, y, h):
+        w = int(round(fraction * self.width))
+        if w > 0:
+            self.buffer[y:y + h, :w] = 0
+            self.dirty_rects.append((y, 0, h, w))
+
 
 class Point(object):
     def __init__(self, name, x_max, x_min, y_max, y_min):
@@ -42,48 +127,137 @@ class Point(object):
 class Chopper(Point):
     def __init__(self, name, x_max, x_min, y_max, y_min):
         super(Chopper, self).__init__(name, x_max, x_min, y_max, y_min)
-        self.icon = cv2.imread("chopper.png") / 255.0
-        self.icon_w = 64
-        self.icon_h = 64
-        self.icon = cv2.resize(self.icon, (self.icon_h, self.icon_w))
-
-
-class Bird(Point):
-    def __init__(self, name, x_max, x_min, y_max, y_min):
-        super(Bird, self).__init__(name, x_max, x_min, y_max, y_min)
-        self.icon = cv2.imread("bird.png") / 255.0
-        self.icon_w = 32
-        self.icon_h = 32
-        self.icon = cv2.resize(self.icon, (self.icon_h, self.icon_w))
-
-
-class Fuel(Point):
-    def __init__(self, name, x_max, x_min, y_max, y_min):
-        super(Fuel, self).__init__(name, x_max, x_min, y_max, y_min)
-        self.icon = cv2.imread("fuel.png") / 255.0
-        self.icon_w = 32
-        self.icon_h = 32
-        self.icon = cv2.resize(self.icon, (self.icon_h, self.icon_w))
+        self.icon_w = chopper_size
+        self.icon_h = chopper_size
+        self.icon = load_sprite("chopper.png", self.icon_w, self.icon_h)
+
+
+# Birds and fuel tanks are kept as arrays of entities of these types
+BIRD = 0
+FUEL = 1
+entity_sprites = ("bird.png", "fuel.png")
+entity_sizes = np.array([32, 32])
+# (del_x, del_y) of each type per step: birds fly left and fuel tanks float up
+entity_velocities = np.array([[-5, 0], [0, -5]])
+
+# (del_x, del_y) of the chopper for each action, 4 and 5 keep it in place
+action_moves = np.array([[0, 5], [0, -5], [5, 0], [-5, 0], [0, 0], [0, 0]])
+
+
+def overlaps(x1, y1, size1, x2, y2, size2):
+    """the collision test of ChopperScape on the top left corners of square icons, broadcast over arrays"""
+    return (2 * np.abs(x1 - x2) <= size1 + size2) & (2 * np.abs(y1 - y2) <= size1 + size2)
+
+
+def draw_scene(screen, chopper_x, chopper_y, chopper_alive, entity_x, entity_y, entity_type, fuel_left, max_fuel,
+               ep_return, y_min):
+    """update screen in place with a game state, erasing only what was drawn in its last frame"""
+    screen.erase()
+
+    # Draw the heliopter on canvas, unless it was removed by a collision with a bird
+    if chopper_alive:
+        screen.draw_sprite("chopper.png", chopper_x, chopper_y, chopper_size, chopper_size)
+    for x, y, a_type in zip(entity_x.tolist(), entity_y.tolist(), entity_type.tolist()):
+        screen.draw_sprite(entity_sprites[a_type], x, y, entity_sizes[a_type], entity_sizes[a_type])
+
+    # Put the info on canvas, the elements stay below y_min so it never overlaps them
+    if screen.mode == 'canvas':
+        screen.draw_text('Fuel Left: {} | Rewards: {}'.format(fuel_left, ep_return), (10, 20))
+    else:
+        # the text would not be legible at the size of the observations
+        screen.draw_bar(fuel_left / max_fuel, 0, max(int(y_min * screen.scale_y) // 2, 1))
+
+
+def state_features(chopper_x, chopper_y, fuel_left, max_fuel, entity_x, entity_y, entity_type, present,
+                   num_nearest, field_size):
+    """
+    float32 features of games given as arrays with a leading game axis, entities on the second one, of shape
+    (games, 3 + 6 * num_nearest): the chopper position over the field size and the fraction of fuel left, then
+    for the num_nearest birds and the num_nearest fuel tanks closest to the chopper (dx, dy, present), the offsets
+    from the center of the chopper to their centers over the field size, nearest first, and zeros when there are
+    fewer of them
+    """
+    height, width = field_size
+    num_games = len(chopper_x)
+    dx = (entity_x + entity_sizes[entity_type] / 2 - (chopper_x + chopper_size / 2)[:, None]) / width
+    dy = (entity_y + entity_sizes[entity_type] / 2 - (chopper_y + chopper_size / 2)[:, None]) / height
+    features = np.zeros((num_games, 3 + 6 * num_nearest), dtype=np.float32)
+    features[:, 0] = chopper_x / width
+    features[:, 1] = chopper_y / height
+    features[:, 2] = fuel_left / max_fuel
+    games = np.arange(num_games)[:, None]
+    for type_index, a_type in enumerate((BIRD, FUEL)):
+        distances = np.where(present & (entity_type == a_type), dx ** 2 + dy ** 2, np.inf)
+        nearest = np.argsort(distances, axis=1)[:, :num_nearest]
+        found = np.isfinite(distances[games, nearest])
+        columns = 3 + 3 * num_nearest * type_index + 3 * np.arange(nearest.shape[1])
+        features[:, columns] = np.where(found, dx[games, nearest], 0)
+        features[:, columns + 1] = np.where(found, dy[games, nearest], 0)
+        features[:, columns + 2] = found
+    return features
 
 
 class ChopperScape(Env):
-    def __init__(self):
+    """
+    obs_mode selects the observations:
+    - 'canvas': the full 600x800 BGR canvas in [0, 1] with the info text, as rendered
+    - 'rgb' or 'gray': uint8 frames of obs_size (height, width) drawn directly at that size, with the fuel left
+      shown as a bar above the playing field instead of the text, and the last frame_stack frames stacked on a
+      first axis when frame_stack > 1
+    - 'state': the state_features of the num_nearest birds and fuel tanks, without drawing anything in step
+    Each step repeats the action for frame_skip frames, summing the rewards and stopping at the end of the episode,
+    and only the last frame is drawn. With pool_frames, a drawn observation is combined with the frame before it by
+    an elementwise minimum, which keeps the (dark) sprites of both on the white background.
+    Observations are views of buffers that later steps overwrite, copy them to keep them.
+    """
+
+    def __init__(self, bird_spawn_prob=0.01, fuel_spawn_prob=0.01, obs_mode='canvas', obs_size=(84, 84),
+                 frame_stack=1, num_nearest=4, frame_skip=1, pool_frames=False):
         super(ChopperScape, self).__init__()
+        assert obs_mode in ('canvas', 'rgb', 'gray', 'state'), \
+            "Invalid obs_mode, must be \"canvas\", \"rgb\", \"gray\" or \"state\""
+        self.obs_mode = obs_mode
+        self.frame_stack = frame_stack
+        self.num_nearest = num_nearest
+        self.frame_skip = frame_skip
+        self.pool_frames = pool_frames and frame_skip > 1 and obs_mode != 'state'
+        self.pool_buffer = None
 
         # Define a 2-D observation space
         self.observation_shape = (600, 800, 3)
-        self.observation_space = spaces.Box(low=np.zeros(self.observation_shape),
-                                            high=np.ones(self.observation_shape),
-                                            dtype=np.float16)
+
+        # Create a canvas to render the environment images upon, reused from one step to the next
+        self.screen = SpriteCanvas(self.observation_shape[:2], self.observation_shape[:2])
+        # whether a window was shown by render, headless builds of cv2 cannot destroy windows
+        self.window = False
+
+        if obs_mode == 'canvas':
+            self.observation_space = UniformBox(0, 1, self.observation_shape, np.float32)
+        elif obs_mode == 'state':
+            self.observation_space = UniformBox(-1, 1, (3 + 6 * num_nearest,), np.float32)
+        else:
+            self.obs_canvas = SpriteCanvas(obs_size, self.observation_shape[:2], obs_mode)
+            frame_shape = self.obs_canvas.shape
+            # Ring buffer of the last frames, each frame is written at i and i + frame_stack so that the last
+            # frame_stack frames are always the contiguous slice [i + 1, i + frame_stack]
+            self.frames = np.zeros((2 * frame_stack,) + frame_shape, dtype=np.uint8)
+            self.frame_index = 0
+            shape = (frame_stack,) + frame_shape if frame_stack > 1 else frame_shape
+            self.observation_space = UniformBox(0, 255, shape, np.uint8)
 
         # Define an action space ranging from 0 to 4
         self.action_space = spaces.Discrete(6, )
 
-        # Create a canvas to render the environment images upon
-        self.canvas = np.ones(self.observation_shape) * 1
+        # Probabilities to spawn a bird and a fuel tank at each step
+        self.bird_spawn_prob = bird_spawn_prob
+        self.fuel_spawn_prob = fuel_spawn_prob
 
-        # Define elements present inside the environment
-        self.elements = []
+        # Define elements present inside the environment: the positions and types of the first num_entities slots
+        # of these arrays, in the order they were spawned, which is also the order they are drawn in
+        self.num_entities = 0
+        self.entity_x = np.zeros(16, dtype=int)
+        self.entity_y = np.zeros(16, dtype=int)
+        self.entity_type = np.zeros(16, dtype=int)
 
         # Maximum fuel chopper can take at once
         self.max_fuel = 1000
@@ -94,21 +268,44 @@ class ChopperScape(Env):
         self.y_max = int(self.observation_shape[0] * 0.9)
         self.x_max = self.observation_shape[1]
 
-    def draw_elements_on_canvas(self):
-        # Init the canvas
-        self.canvas = np.ones(self.observation_shape) * 1
-
-        # Draw the heliopter on canvas
-        for elem in self.elements:
-            elem_shape = elem.icon.shape
-            x, y = elem.x, elem.y
-            self.canvas[y: y + elem_shape[1], x:x + elem_shape[0]] = elem.icon
-
-        text = 'Fuel Left: {} | Rewards: {}'.format(self.fuel_left, self.ep_return)
-
-        # Put the info on canvas
-        self.canvas = cv2.putText(self.canvas, text, (10, 20), font,
-                                  0.8, (0, 0, 0), 1, cv2.LINE_AA)
+    @property
+    def canvas(self):
+        return self.screen.buffer
+
+    def draw_elements_on_canvas(self, screen=None):
+        """update screen (the canvas by default) in place, erasing only what was drawn in its last frame"""
+        n = self.num_entities
+        draw_scene(self.screen if screen is None else screen, self.chopper.x, self.chopper.y, self.chopper_alive,
+                   self.entity_x[:n], self.entity_y[:n], self.entity_type[:n], self.fuel_left, self.max_fuel,
+                   self.ep_return, self.y_min)
+
+    def draw_frame(self):
+        """draw the current state on the canvas the observations are made of, and return its buffer"""
+        screen = self.screen if self.obs_mode == 'canvas' else self.obs_canvas
+        self.draw_elements_on_canvas(screen)
+        return screen.buffer
+
+    def observe(self, first=False, previous_frame=None):
+        """draw the observation of the current state, first when the episode starts, pooled with previous_frame"""
+        if self.obs_mode == 'state':
+            n = self.num_entities
+            return state_features(np.array([self.chopper.x]), np.array([self.chopper.y]), self.fuel_left,
+                                  self.max_fuel, self.entity_x[None, :n], self.entity_y[None, :n],
+                                  self.entity_type[None, :n], True, self.num_nearest, self.observation_shape[:2])[0]
+        frame = self.draw_frame()
+        if previous_frame is not None:
+            frame = np.minimum(frame, previous_frame, out=previous_frame)
+        if self.obs_mode == 'canvas':
+            return frame
+        if first:
+            self.frame_index = 0
+            self.frames[:] = frame
+        else:
+            self.frame_index = (self.frame_index + 1) % self.frame_stack
+            self.frames[self.frame_index] = frame
+            self.frames[self.frame_index + self.frame_stack] = frame
+        frames = self.frames[self.frame_index + 1:self.frame_index + self.frame_stack + 1]
+        return frames if self.frame_stack > 1 else frames[0]
 
     def reset(self):
         # Reset the fuel consumed
@@ -128,22 +325,27 @@ class ChopperScape(Env):
         # Intialise the chopper
         self.chopper = Chopper("chopper", self.x_max, self.x_min, self.y_max, self.y_min)
         self.chopper.set_position(x, y)
+        self.chopper_alive = True
 
         # Intialise the elements
-        self.elements = [self.chopper]
+        self.num_entities = 0
 
-        # Reset the Canvas
-        self.canvas = np.ones(self.observation_shape) * 1
+        # Reset the Canvas; in the other modes the canvas is allocated when it is first rendered
+        if self.obs_mode == 'canvas':
+            self.screen.clear()
+        elif self.obs_mode in ('rgb', 'gray'):
+            self.obs_canvas.clear()
 
-        # Draw elements on the canvas
-        self.draw_elements_on_canvas()
-
-        # return the observation
-        return self.canvas
+        # Draw elements on the canvas and return the observation
+        return self.observe(first=True)
 
     def render(self, mode="human"):
         assert mode in ["human", "rgb_array"], "Invalid mode, must be either \"human\" or \"rgb_array\""
+        if self.obs_mode != 'canvas':
+            # the canvas is only drawn when it is rendered
+            self.draw_elements_on_canvas()
         if mode == "human":
+            self.window = True
             cv2.imshow("Game", self.canvas)
             cv2.waitKey(10)
 
@@ -151,29 +353,47 @@ class ChopperScape(Env):
             return self.canvas
 
     def has_collided(self, elem1, elem2):
-        x_col = False
-        y_col = False
-
-        elem1_x, elem1_y = elem1.get_position()
-        elem2_x, elem2_y = elem2.get_position()
+        return bool(overlaps(elem1.x, elem1.y, elem1.icon_w, elem2.x, elem2.y, elem2.icon_w))
+
+    def spawn(self, a_type, x, y):
+        """add an entity of a_type at (x, y), clamped to the permissible area"""
+        if self.num_entities == len(self.entity_x):
+            self.entity_x = np.concatenate([self.entity_x, np.zeros_like(self.entity_x)])
+            self.entity_y = np.concatenate([self.entity_y, np.zeros_like(self.entity_y)])
+            self.entity_type = np.concatenate([self.entity_type, np.zeros_like(self.entity_type)])
+        size = entity_sizes[a_type]
+        self.entity_x[self.num_entities] = min(max(x, self.x_min), self.x_max - size)
+        self.entity_y[self.num_entities] = min(max(y, self.y_min), self.y_max - size)
+        self.entity_type[self.num_entities] = a_type
+        self.num_entities += 1
 
-        if 2 * abs(elem1_x - elem2_x) <= (elem1.icon_w + elem2.icon_w):
-            x_col = True
+    def step(self, action):
+        # Assert that it is a valid action
+        assert self.action_space.contains(action), "Invalid Action"
 
-        if 2 * abs(elem1_y - elem2_y) <= (elem1.icon_h + elem2.icon_h):
-            y_col = True
+        total_reward = 0
+        pooled = False
+        for a_frame in range(self.frame_skip):
+            if self.pool_frames and a_frame == self.frame_skip - 1:
+                # keep the frame before the last one to pool the observation with
+                if self.pool_buffer is None:
+                    self.pool_buffer = np.empty_like(self.draw_frame())
+                self.pool_buffer[:] = self.draw_frame()
+                pooled = True
+            reward, done = self.advance(action)
+            total_reward += reward
+            if done:
+                break
 
-        if x_col and y_col:
-            return True
+        # Draw elements on the canvas
+        observation = self.observe(previous_frame=self.pool_buffer if pooled else None)
+        return observation, total_reward, done, []
 
-        return False
-    def step(self, action):
+    def advance(self, action):
+        """move the game on by one frame, returning the reward and whether the episode is done"""
         # Flag that marks the termination of an episode
         done = False
 
-        # Assert that it is a valid action
-        assert self.action_space.contains(action), "Invalid Action"
-
         # Decrease the fuel counter
         self.fuel_left -= 1
 
@@ -181,95 +401,67 @@ class ChopperScape(Env):
         reward = 1
 
         # apply the action to the chopper
-        if action == 0:
-            self.chopper.move(0, 5)
-        elif action == 1:
-            self.chopper.move(0, -5)
-        elif action == 2:
-            self.chopper.move(5, 0)
-        elif action == 3:
-            self.chopper.move(-5, 0)
-        elif action == 4:
-            self.chopper.move(0, 0)
-
-        # Spawn a bird at the right edge with prob 0.01
-        if random.random() < 0.01:
-            # Spawn a bird
-            spawned_bird = Bird("bird_{}".format(self.bird_count), self.x_max, self.x_min, self.y_max, self.y_min)
-            self.bird_count += 1
+        self.chopper.move(*action_moves[action].tolist())
 
-            # Compute the x,y co-ordinates of the position from where the bird has to be spawned
+        # Spawn a bird at the right edge with prob bird_spawn_prob
+        if random.random() < self.bird_spawn_prob:
             # Horizontally, the position is on the right edge and vertically, the height is randomly
             # sampled from the set of permissible values
-            bird_x = self.x_max
-            bird_y = random.randrange(self.y_min, self.y_max)
-            spawned_bird.set_position(self.x_max, bird_y)
-
-            # Append the spawned bird to the elements currently present in Env.
-            self.elements.append(spawned_bird)
-
-        # Spawn a fuel at the bottom edge with prob 0.01
-        if random.random() < 0.01:
-            # Spawn a fuel tank
-            spawned_fuel = Fuel("fuel_{}".format(self.bird_count), self.x_max, self.x_min, self.y_max, self.y_min)
-            self.fuel_count += 1
+            self.spawn(BIRD, self.x_max, random.randrange(self.y_min, self.y_max))
+            self.bird_count += 1
 
-            # Compute the x,y co-ordinates of the position from where the fuel tank has to be spawned
+        # Spawn a fuel at the bottom edge with prob fuel_spawn_prob
+        if random.random() < self.fuel_spawn_prob:
             # Horizontally, the position is randomly chosen from the list of permissible values and
             # vertically, the position is on the bottom edge
-            fuel_x = random.randrange(self.x_min, self.x_max)
-            fuel_y = self.y_max
-            spawned_fuel.set_position(fuel_x, fuel_y)
-
-            # Append the spawned fuel tank to the elemetns currently present in the Env.
-            self.elements.append(spawned_fuel)
-
-        # For elements in the Ev
-        for elem in self.elements:
-            if isinstance(elem, Bird):
-                # If the bird has reached the left edge, remove it from the Env
-                if elem.get_position()[0] <= self.x_min:
-                    self.elements.remove(elem)
-                else:
-                    # Move the bird left by 5 pts.
-                    elem.move(-5, 0)
-
-                # If the bird has collided.
-                if self.has_collided(self.chopper, elem):
-                    # Conclude the episode and remove the chopper from the Env.
-                    done = True
-                    reward = -10
-                    self.elements.remove(self.chopper)
-
-            if isinstance(elem, Fuel):
-                # If the fuel tank has reached the top, remove it from the Env
-                if elem.get_position()[1] <= self.y_min:
-                    self.elements.remove(elem)
-                else:
-                    # Move the Tank up by 5 pts.
-                    elem.move(0, -5)
-
-                # If the fuel tank has collided with the chopper.
-                if self.has_collided(self.chopper, elem):
-                    # Remove the fuel tank from the env.
-                    self.elements.remove(elem)
-
-                    # Fill the fuel tank of the chopper to full.
-                    self.fuel_left = self.max_fuel
+            self.spawn(FUEL, random.randrange(self.x_min, self.x_max), self.y_max)
+            self.fuel_count += 1
+
+        n = self.num_entities
+        x = self.entity_x[:n]
+        y = self.entity_y[:n]
+        types = self.entity_type[:n]
+
+        # Birds that have reached the left edge and fuel tanks that have reached the top leave the Env
+        keep = np.where(types == BIRD, x > self.x_min, y > self.y_min)
+
+        # The others move by the velocity of their type, within the permissible area
+        sizes = entity_sizes[types]
+        velocities = entity_velocities[types]
+        x = np.clip(x + velocities[:, 0], self.x_min, self.x_max - sizes)[keep]
+        y = np.clip(y + velocities[:, 1], self.y_min, self.y_max - sizes)[keep]
+        types = types[keep]
+
+        collided = overlaps(self.chopper.x, self.chopper.y, self.chopper.icon_w, x, y, entity_sizes[types])
+        if self.chopper_alive and np.any(collided & (types == BIRD)):
+            # Conclude the episode and remove the chopper from the Env.
+            done = True
+            reward = -10
+            self.chopper_alive = False
+        fueled = collided & (types == FUEL)
+        if np.any(fueled):
+            # Fill the fuel tank of the chopper to full, and remove the fuel tanks from the env.
+            self.fuel_left = self.max_fuel
+            keep = ~fueled
+            x, y, types = x[keep], y[keep], types[keep]
+
+        self.num_entities = len(types)
+        self.entity_x[:self.num_entities] = x
+        self.entity_y[:self.num_entities] = y
+        self.entity_type[:self.num_entities] = types
 
         # Increment the episodic return
         self.ep_return += 1
 
-        # Draw elements on the canvas
-        self.draw_elements_on_canvas()
-
         # If out of fuel, end the episode.
         if self.fuel_left == 0:
             done = True
 
-        return self.canvas, reward, done, []
+        return reward, done
+
     def close(self):
-        cv2.destroyAllWindows()
+        if self.window:
+            cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
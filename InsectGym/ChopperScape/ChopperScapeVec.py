@@ -0,0 +1,239 @@
+import numpy as np
+import cv2
+import gym
+from gym import spaces
+from gym.utils import seeding
+from gym.vector import VectorEnv
+from InsectGym.ChopperScape.ChopperScape import ChopperScape, SpriteCanvas, draw_scene, overlaps, state_features, \
+    BIRD, FUEL, entity_sizes, entity_velocities, action_moves, chopper_size
+
+
+class ChopperScapeVec(VectorEnv):
+    """
+    num_envs ChopperScape games held in stacked arrays and stepped together by one vectorized update.
+
+    The chopper of every game is a row of chopper_x, chopper_y, chopper_alive, fuel_left and ep_return, and the birds
+    and fuel tanks of a game are the first num_entities[game] slots of its row of entity_x, entity_y and entity_type,
+    in spawn order. Games that are done, or that have been stepped max_episode_steps times, are reset in the same
+    step, and the observations returned are those of the new episodes; the infos of the latter have
+    'TimeLimit.truncated', as with the TimeLimit wrapper.
+
+    Observations are drawn per game with the obs_mode, obs_size and frame_stack of ChopperScape, only for the games
+    passed as observe to step (all of them by default); the other rows of the observations keep their last frames.
+    The 'state' observations of all games are computed together and never draw anything.
+    The observations returned are a buffer that later steps overwrite, copy them to keep them.
+    """
+
+    def __init__(self, num_envs, bird_spawn_prob=0.01, fuel_spawn_prob=0.01, obs_mode='canvas', obs_size=(84, 84),
+                 frame_stack=1, num_nearest=4, max_episode_steps=None, seed=None):
+        template = ChopperScape(bird_spawn_prob, fuel_spawn_prob, obs_mode, obs_size, frame_stack, num_nearest)
+        # VectorEnv.__init__ would tile the bounds of the observation space num_envs times
+        gym.Env.__init__(self)
+        self.num_envs = num_envs
+        self.is_vector_env = True
+        self.observation_space = template.observation_space.batch(num_envs)
+        self.action_space = spaces.Tuple((template.action_space,) * num_envs)
+        self.closed = False
+        self.viewer = None
+        self.single_observation_space = template.observation_space
+        self.single_action_space = template.action_space
+        self.bird_spawn_prob = bird_spawn_prob
+        self.fuel_spawn_prob = fuel_spawn_prob
+        self.obs_mode = obs_mode
+        self.obs_size = obs_size if obs_mode != 'canvas' else template.observation_shape[:2]
+        self.frame_stack = frame_stack
+        self.num_nearest = num_nearest
+        self.field_size = template.observation_shape[:2]
+        self.max_fuel = template.max_fuel
+        self.x_min, self.x_max = template.x_min, template.x_max
+        self.y_min, self.y_max = template.y_min, template.y_max
+        self.max_episode_steps = max_episode_steps
+
+        self.chopper_x = np.zeros(num_envs, dtype=int)
+        self.chopper_y = np.zeros(num_envs, dtype=int)
+        self.chopper_alive = np.ones(num_envs, dtype=bool)
+        self.fuel_left = np.zeros(num_envs, dtype=int)
+        self.ep_return = np.zeros(num_envs, dtype=int)
+        self.elapsed = np.zeros(num_envs, dtype=int)
+        self.num_entities = np.zeros(num_envs, dtype=int)
+        self.entity_x = np.zeros((num_envs, 16), dtype=int)
+        self.entity_y = np.zeros((num_envs, 16), dtype=int)
+        self.entity_type = np.zeros((num_envs, 16), dtype=int)
+
+        # Canvases of the games, created when a game is first observed, and the last frame_stack frames of each game
+        self.canvases = [None] * num_envs
+        self.screen = None
+        self.window = False
+        self.frames = None
+        self.first_frame = np.ones(num_envs, dtype=bool)
+        self.actions = None
+        self.seed(seed)
+
+    @classmethod
+    def from_spec(cls, spec, num_envs, seed=None, **kwargs):
+        """
+        the games of the env registered as spec, made with the kwargs of its registration updated with kwargs, so
+        they have the observation space of the registered env
+        """
+        # the registration kwargs are spec._kwargs before gym 0.22
+        kwargs = dict(getattr(spec, 'kwargs', getattr(spec, '_kwargs', {})), **kwargs)
+        assert kwargs.pop('frame_skip', 1) == 1 and not kwargs.pop('pool_frames', False), \
+            "ChopperScapeVec does not skip frames, use make_vec with mode='sync' or 'subproc'"
+        return cls(num_envs, max_episode_steps=spec.max_episode_steps, seed=seed, **kwargs)
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def reset_games(self, games):
+        """start new episodes in games, as in ChopperScape.reset"""
+        n = len(games)
+        x = self.np_random.randint(int(self.field_size[0] * 0.05), int(self.field_size[0] * 0.10), size=n)
+        y = self.np_random.randint(int(self.field_size[1] * 0.15), int(self.field_size[1] * 0.20), size=n)
+        self.chopper_x[games] = np.clip(x, self.x_min, self.x_max - chopper_size)
+        self.chopper_y[games] = np.clip(y, self.y_min, self.y_max - chopper_size)
+        self.chopper_alive[games] = True
+        self.fuel_left[games] = self.max_fuel
+        self.ep_return[games] = 0
+        self.elapsed[games] = 0
+        self.num_entities[games] = 0
+        self.first_frame[games] = True
+
+    def reset_wait(self, observe=None, **kwargs):
+        self.reset_games(np.arange(self.num_envs))
+        return self.observe(observe)
+
+    def spawn(self, games, a_type, x, y):
+        """add an entity of a_type at (x[i], y[i]) to each of games, clamped to the permissible area"""
+        if len(games) == 0:
+            return
+        if self.num_entities[games].max() == self.entity_x.shape[1]:
+            self.entity_x = np.concatenate([self.entity_x, np.zeros_like(self.entity_x)], axis=1)
+            self.entity_y = np.concatenate([self.entity_y, np.zeros_like(self.entity_y)], axis=1)
+            self.entity_type = np.concatenate([self.entity_type, np.zeros_like(self.entity_type)], axis=1)
+        size = entity_sizes[a_type]
+        slots = self.num_entities[games]
+        self.entity_x[games, slots] = np.clip(x, self.x_min, self.x_max - size)
+        self.entity_y[games, slots] = np.clip(y, self.y_min, self.y_max - size)
+        self.entity_type[games, slots] = a_type
+        self.num_entities[games] += 1
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions)
+
+    def step_wait(self, observe=None, **kwargs):
+        # Decrease the fuel counters, and reward executing a step
+        self.fuel_left -= 1
+        rewards = np.ones(self.num_envs)
+        dones = np.zeros(self.num_envs, dtype=bool)
+
+        # apply the actions to the choppers
+        moves = action_moves[self.actions]
+        self.chopper_x = np.clip(self.chopper_x + moves[:, 0], self.x_min, self.x_max - chopper_size)
+        self.chopper_y = np.clip(self.chopper_y + moves[:, 1], self.y_min, self.y_max - chopper_size)
+
+        # Spawn birds at the right edge and fuel tanks at the bottom edge
+        spawns = self.np_random.rand(self.num_envs, 2)
+        games = np.flatnonzero(spawns[:, 0] < self.bird_spawn_prob)
+        self.spawn(games, BIRD, self.x_max, self.np_random.randint(self.y_min, self.y_max, size=len(games)))
+        games = np.flatnonzero(spawns[:, 1] < self.fuel_spawn_prob)
+        self.spawn(games, FUEL, self.np_random.randint(self.x_min, self.x_max, size=len(games)), self.y_max)
+
+        # Birds that have reached the left edge and fuel tanks that have reached the top leave the games, the
+        # others move by the velocity of their type
+        types = self.entity_type
+        present = np.arange(types.shape[1]) < self.num_entities[:, None]
+        keep = present & np.where(types == BIRD, self.entity_x > self.x_min, self.entity_y > self.y_min)
+        sizes = entity_sizes[types]
+        velocities = entity_velocities[types]
+        x = np.clip(self.entity_x + velocities[..., 0], self.x_min, self.x_max - sizes)
+        y = np.clip(self.entity_y + velocities[..., 1], self.y_min, self.y_max - sizes)
+
+        collided = keep & overlaps(self.chopper_x[:, None], self.chopper_y[:, None], chopper_size, x, y, sizes)
+        crashed = self.chopper_alive & np.any(collided & (types == BIRD), axis=1)
+        dones |= crashed
+        rewards[crashed] = -10
+        self.chopper_alive &= ~crashed
+        fueled = collided & (types == FUEL)
+        self.fuel_left[np.any(fueled, axis=1)] = self.max_fuel
+        keep &= ~fueled
+
+        # Move the entities kept to the front of their rows, in spawn order
+        order = np.argsort(~keep, axis=1, kind='stable')
+        self.entity_x = np.take_along_axis(x, order, axis=1)
+        self.entity_y = np.take_along_axis(y, order, axis=1)
+        self.entity_type = np.take_along_axis(types, order, axis=1)
+        self.num_entities = keep.sum(axis=1)
+
+        self.ep_return += 1
+        self.elapsed += 1
+        dones |= self.fuel_left == 0
+        infos = [{} for a_game in range(self.num_envs)]
+        if self.max_episode_steps is not None:
+            truncated = ~dones & (self.elapsed >= self.max_episode_steps)
+            for a_game in np.flatnonzero(truncated):
+                infos[a_game]['TimeLimit.truncated'] = True
+            dones |= truncated
+        if np.any(dones):
+            self.reset_games(np.flatnonzero(dones))
+        return self.observe(observe), rewards, dones, infos
+
+    def step(self, actions, observe=None):
+        self.step_async(actions)
+        return self.step_wait(observe)
+
+    def draw(self, game, screen):
+        n = self.num_entities[game]
+        draw_scene(screen, self.chopper_x[game], self.chopper_y[game], self.chopper_alive[game],
+                   self.entity_x[game, :n], self.entity_y[game, :n], self.entity_type[game, :n],
+                   self.fuel_left[game], self.max_fuel, self.ep_return[game], self.y_min)
+
+    def observe(self, games=None):
+        """draw the observations of games (all of them by default), and return the observations of all games"""
+        if self.obs_mode == 'state':
+            present = np.arange(self.entity_x.shape[1]) < self.num_entities[:, None]
+            return state_features(self.chopper_x, self.chopper_y, self.fuel_left, self.max_fuel, self.entity_x,
+                                  self.entity_y, self.entity_type, present, self.num_nearest, self.field_size)
+        games = range(self.num_envs) if games is None else games
+        if self.frames is None:
+            frame_canvas = SpriteCanvas(self.obs_size, self.field_size, self.obs_mode)
+            self.frames = np.zeros((self.num_envs, self.frame_stack) + frame_canvas.shape, dtype=frame_canvas.dtype)
+        for game in games:
+            if self.canvases[game] is None:
+                self.canvases[game] = SpriteCanvas(self.obs_size, self.field_size, self.obs_mode)
+            canvas = self.canvases[game]
+            if self.first_frame[game]:
+                canvas.clear()
+            self.draw(game, canvas)
+            if self.first_frame[game]:
+                self.frames[game] = canvas.buffer
+                self.first_frame[game] = False
+            else:
+                self.frames[game, :-1] = self.frames[game, 1:]
+                self.frames[game, -1] = canvas.buffer
+        return self.frames if self.frame_stack > 1 else self.frames[:, 0]
+
+    def render(self, mode="human", game=0):
+        assert mode in ["human", "rgb_array"], "Invalid mode, must be either \"human\" or \"rgb_array\""
+        if self.screen is None:
+            self.screen = SpriteCanvas(self.field_size, self.field_size)
+        self.draw(game, self.screen)
+        if mode == "human":
+            self.window = True
+            cv2.imshow("Game", self.screen.buffer)
+            cv2.waitKey(10)
+        elif mode == "rgb_array":
+            return self.screen.buffer
+
+    def close_extras(self, **kwargs):
+        if self.window:
+            cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    env = ChopperScapeVec(64, obs_mode='gray', frame_stack=4, seed=0)
+    obs = env.reset()
+    for a_step in range(1000):
+        obs, rewards, dones, infos = env.step(env.np_random.randint(6, size=env.num_envs))
+    print(obs.shape, env.ep_return.mean())
+    env.close()
@@ -0,0 +1,101 @@
+from collections import namedtuple
+import numpy as np
+from gym.utils import seeding
+from InsectGym.MaggotInPetriDish.MaggotInPetriDish import MaggotInPetriDishEnv
+
+"""
+Odor/reinforcer conditioning protocols, e.g. Gerber & Hendel (2006): training trials alternating AM with fructose
+and OCT without a reinforcer, followed by a test in a dish with both odors.
+
+Every distinct dish configuration of a protocol is compiled into a MaggotInPetriDishEnv TransitionTable once (and
+shared between protocols), and a population of Q-learning larvae is run through all phases at once as NumPy
+arrays, keeping what it learned from one phase to the next.
+"""
+
+Phase = namedtuple('Phase', ['name', 'odor', 'reinforcer', 'duration', 'learning'])
+Phase.__new__.__defaults__ = (True,)
+
+# (odor, reinforcer, num_locations, never_done) -> MaggotInPetriDishEnv
+env_cache = {}
+
+
+def dish_env(odor, reinforcer, num_locations=5, never_done=True):
+    key = (tuple(odor), tuple(reinforcer), num_locations, never_done)
+    if key not in env_cache:
+        env_cache[key] = MaggotInPetriDishEnv(list(odor), list(reinforcer), num_locations=num_locations,
+                                              never_done=never_done)
+    return env_cache[key]
+
+
+def gerber_hendel_protocol(training_trials=3, trial_duration=50, test_duration=50, reinforcer='fructose'):
+    """AM paired with the reinforcer and OCT unpaired for each training trial, then a test with both odors"""
+    phases = []
+    for a_trial in range(training_trials):
+        phases.append(Phase('AM+ %d' % a_trial, ('AM', 'AM'), (reinforcer,), trial_duration))
+        phases.append(Phase('OCT %d' % a_trial, ('OCT', 'OCT'), (None,), trial_duration))
+    phases.append(Phase('test', ('AM', 'OCT'), (None,), test_duration, False))
+    return phases
+
+
+class ConditioningProtocol:
+    def __init__(self, phases, num_locations=5, never_done=True):
+        self.phases = list(phases)
+        self.num_locations = num_locations
+        self.envs = [dish_env(phase.odor, phase.reinforcer, num_locations, never_done) for phase in self.phases]
+        self.nS = self.envs[0].nS
+        self.nA = self.envs[0].nA
+        locations = np.arange(num_locations)
+        # -1 for the left (AM) half of the dish, 0 for the middle location, 1 for the right (OCT) half
+        self.sides = np.sign(2 * locations + 1 - num_locations)
+
+    def run(self, num_agents=30, group_size=30, alpha=0.1, gamma=0.9, epsilon=0.1, seed=None, Q=None):
+        """
+        run num_agents epsilon-greedy Q-learning larvae through every phase, the larvae being put back at the start
+        location of the dish at the beginning of each phase. Returns a dict of
+            -Q: the action values learned, shape (num_agents, nS, nA)
+            -rewards: per phase, the mean reward over the agents at each step
+            -preference_index: per phase, the preference index over all agents at each step
+            -group_preference_index: the preference index of each group of group_size agents at the end of each
+             phase, shape (num_phases, num_groups)
+        """
+        np_random, seed = seeding.np_random(seed)
+        agents = np.arange(num_agents)
+        Q = np.zeros((num_agents, self.nS, self.nA)) if Q is None else Q.copy()
+        groups = agents // group_size
+        num_groups = groups[-1] + 1
+        results = {'Q': Q, 'rewards': [], 'preference_index': [],
+                   'group_preference_index': np.zeros((len(self.phases), num_groups))}
+        for phase_index, (phase, env) in enumerate(zip(self.phases, self.envs)):
+            table = env.table
+            locations = np_random.choice(self.nS, size=num_agents, p=env.isd)
+            rewards = np.zeros(phase.duration)
+            preference_index = np.zeros(phase.duration)
+            for a_step in range(phase.duration):
+                # epsilon-greedy, breaking ties between equal action values at random
+                values = Q[agents, locations] + 1e-9 * np_random.rand(num_agents, self.nA)
+                actions = values.argmax(axis=1)
+                explore = np_random.rand(num_agents) < epsilon
+                actions[explore] = np_random.randint(self.nA, size=explore.sum())
+                k = table.sample(locations, actions, np_random.rand(num_agents))
+                reward = table.rewards[locations, actions, k]
+                done = table.dones[locations, actions, k]
+                new_locations = table.next_states[locations, actions, k]
+                if phase.learning:
+                    target = reward + gamma * ~done * Q[agents, new_locations].max(axis=1)
+                    Q[agents, locations, actions] += alpha * (target - Q[agents, locations, actions])
+                locations = new_locations
+                sides = self.sides[locations]
+                rewards[a_step] = reward.mean()
+                preference_index[a_step] = -sides.mean()
+            results['rewards'].append(rewards)
+            results['preference_index'].append(preference_index)
+            group_sizes = np.bincount(groups, minlength=num_groups)
+            results['group_preference_index'][phase_index] = -np.bincount(groups, weights=sides) / group_sizes
+        return results
+
+
+if __name__ == "__main__":
+    protocol = ConditioningProtocol(gerber_hendel_protocol())
+    results = protocol.run(num_agents=300, seed=0)
+    for phase, rewards, group_pi in zip(protocol.phases, results['rewards'], results['group_preference_index']):
+        print(phase.name, rewards.mean(), group_pi.mean())
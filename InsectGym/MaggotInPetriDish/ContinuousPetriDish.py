@@ -0,0 +1,203 @@
+import numpy as np
+import cv2
+from scipy.signal import fftconvolve
+from scipy.special import k0
+from gym import Env, spaces
+from gym.utils import seeding
+
+
+def odor_field(source, grid_size, dish_radius, decay_length):
+    """
+    steady-state concentration of an odor diffusing from a point source and decaying with the length scale
+    decay_length, computed on a grid over the dish by FFT convolution with the 2-D Green's function K0(r / decay_length)
+    and normalised to a maximum of 1
+    """
+    cell = 2 * dish_radius / (grid_size - 1)
+    sources = np.zeros((grid_size, grid_size))
+    col = int(round((source[0] + dish_radius) / cell))
+    row = int(round((source[1] + dish_radius) / cell))
+    sources[row, col] = 1
+    offsets = np.arange(-grid_size + 1, grid_size) * cell
+    r = np.hypot(offsets[:, None], offsets[None, :])
+    kernel = k0(np.maximum(r, cell / 2) / decay_length)
+    field = fftconvolve(sources, kernel, mode='same')
+    return field / field.max()
+
+
+def bilinear(grids, x, y, dish_radius):
+    """sample grids of shape (..., grid_size, grid_size) at arrays of positions x, y by bilinear interpolation"""
+    grid_size = grids.shape[-1]
+    u = (np.clip(x, -dish_radius, dish_radius) + dish_radius) / (2 * dish_radius) * (grid_size - 1)
+    v = (np.clip(y, -dish_radius, dish_radius) + dish_radius) / (2 * dish_radius) * (grid_size - 1)
+    col = np.minimum(u.astype(int), grid_size - 2)
+    row = np.minimum(v.astype(int), grid_size - 2)
+    fu = u - col
+    fv = v - row
+    return (grids[..., row, col] * (1 - fu) * (1 - fv) + grids[..., row, col + 1] * fu * (1 - fv) +
+            grids[..., row + 1, col] * (1 - fu) * fv + grids[..., row + 1, col + 1] * fu * fv)
+
+
+class ContinuousPetriDishEnv(Env):
+    """
+    Continuous 2-D version of MaggotInPetriDish for a population of larvae
+
+    Description:
+    A round dish of radius dish_radius (mm) with an amylacetate (AM) source on the left and a 1-octanol (OCT)
+    source on the right, for the odors listed in odor, and the reinforcers listed in reinforcer spread over the dish.
+    Odor concentrations are precomputed on a grid (see odor_field) together with their gradients and sampled by
+    bilinear interpolation, so each step costs a few array operations for any number of larvae.
+
+    Observations:
+    One row per larva: (x, y, heading, AM concentration, OCT concentration).
+
+    Actions:
+    One action per larva, with the MaggotInPetriDish vocabulary:
+    - 0: None, crawl on with a random heading drift
+    - 1: apetite to amylacetate (AM), turn up the AM gradient
+    - 2: escape from amylacetate (AM), turn down the AM gradient
+    - 3: apetite to 1-octanol (OCT), turn up the OCT gradient
+    - 4: escape from 1-octanol (OCT), turn down the OCT gradient
+
+    Rewards:
+    As in MaggotInPetriDish, apetite to a present odor (action 1 for AM, action 3 for OCT) is rewarded with 1 on
+    fructose and -1 on quinine hemisulphate, and a reward of 1 is done unless never_done.
+
+    step returns, as a single-agent gym env, the total reward of the population and whether every larva is done,
+    with the per-larva arrays of rewards and dones in the info as 'rewards' and 'dones'; larvae that are done keep
+    crawling.
+    """
+
+    metadata = {"render.modes": ["human", "rgb_array"]}
+
+    def __init__(self, odor=['AM', 'OCT'], reinforcer=['fructose'], num_larvae=1000, never_done=False,
+                 dish_radius=42.5, source_distance=25.0, decay_length=20.0, grid_size=129,
+                 speed=1.0, turn_rate=0.5, heading_noise=0.3, dt=1.0):
+        optional_odor = (None, 'AM', 'OCT')
+        optional_reinforcer = (None, 'fructose', 'quinine')
+        for an_odor in odor:
+            assert an_odor in optional_odor, str(an_odor) + " is not an available odor in the experiment"
+        for a_reinforcer in reinforcer:
+            assert a_reinforcer in optional_reinforcer, \
+                str(a_reinforcer) + " is not an available reinforcer in the experiment"
+        self.odor = odor
+        self.reinforcer = reinforcer
+        self.num_larvae = num_larvae
+        self.never_done = never_done
+        self.dish_radius = dish_radius
+        self.speed = speed
+        self.turn_rate = turn_rate
+        self.heading_noise = heading_noise
+        self.dt = dt
+
+        # odor fields, (AM, OCT), with the odors of both sides of the dish adding up as in MaggotInPetriDish
+        sources = ((-source_distance, 0.0), (source_distance, 0.0))
+        source_fields = [odor_field(a_source, grid_size, dish_radius, decay_length) for a_source in sources]
+        self.fields = np.zeros((2, grid_size, grid_size))
+        for side, an_odor in enumerate(odor):
+            if an_odor is not None:
+                self.fields[('AM', 'OCT').index(an_odor)] += source_fields[side]
+        cell = 2 * dish_radius / (grid_size - 1)
+        gradient_y, gradient_x = np.gradient(self.fields, cell, axis=(1, 2))
+        # sampled together: AM, OCT, d AM / dx, d OCT / dx, d AM / dy, d OCT / dy
+        self.grids = np.concatenate([self.fields, gradient_x, gradient_y])
+
+        if 'fructose' in reinforcer:
+            reinforcer_reward = 1
+        elif 'quinine' in reinforcer:
+            reinforcer_reward = -1
+        else:
+            reinforcer_reward = 0
+        self.action_rewards = np.zeros(5)
+        if 'AM' in odor:
+            self.action_rewards[1] = reinforcer_reward
+        if 'OCT' in odor:
+            self.action_rewards[3] = reinforcer_reward
+        # for each action: the odor it follows and the direction, up (1) or down (-1) the gradient
+        self.action_odor = np.array([0, 0, 0, 1, 1])
+        self.action_direction = np.array([0, 1, -1, 1, -1])
+
+        self.action_space = spaces.MultiDiscrete(np.full(num_larvae, 5))
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(num_larvae, 5), dtype=np.float32)
+        self.canvas_background = None
+        # whether a window was shown by render, headless builds of cv2 cannot destroy windows
+        self.window = False
+        self.seed()
+        self.reset()
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def reset(self):
+        # larvae start in the middle of the dish, as in MaggotInPetriDish
+        self.positions = np.zeros((self.num_larvae, 2))
+        self.headings = self.np_random.uniform(-np.pi, np.pi, self.num_larvae)
+        self.samples = bilinear(self.grids, self.positions[:, 0], self.positions[:, 1], self.dish_radius)
+        return self.observation()
+
+    def observation(self):
+        return np.column_stack([self.positions, self.headings, self.samples[0], self.samples[1]]).astype(np.float32)
+
+    def step(self, actions):
+        actions = np.broadcast_to(np.asarray(actions), (self.num_larvae,))
+        larvae = np.arange(self.num_larvae)
+        odor = self.action_odor[actions]
+        gradient_x = self.samples[2 + odor, larvae]
+        gradient_y = self.samples[4 + odor, larvae]
+        # turn towards (or away from) the gradient of the chosen odor, nothing to follow without an odor gradient
+        steer = np.sin(np.arctan2(gradient_y, gradient_x) - self.headings) * (np.hypot(gradient_x, gradient_y) > 0)
+        self.headings = (self.headings + self.turn_rate * self.action_direction[actions] * steer * self.dt +
+                         self.heading_noise * np.sqrt(self.dt) * self.np_random.randn(self.num_larvae))
+        self.positions += self.speed * self.dt * np.column_stack([np.cos(self.headings), np.sin(self.headings)])
+
+        # larvae hitting the wall of the dish are put back on it and turned around
+        distances = np.hypot(self.positions[:, 0], self.positions[:, 1])
+        outside = distances > self.dish_radius
+        self.positions[outside] *= (self.dish_radius / distances[outside])[:, None]
+        self.headings[outside] += np.pi
+        self.headings = (self.headings + np.pi) % (2 * np.pi) - np.pi
+
+        self.samples = bilinear(self.grids, self.positions[:, 0], self.positions[:, 1], self.dish_radius)
+        rewards = self.action_rewards[actions]
+        dones = (rewards == 1) & (not self.never_done)
+        return self.observation(), float(rewards.sum()), bool(dones.all()), {'rewards': rewards, 'dones': dones}
+
+    def preference_index(self):
+        """(#left - #right) / #larvae, the left side being the AM side of the dish"""
+        return (np.sum(self.positions[:, 0] < 0) - np.sum(self.positions[:, 0] > 0)) / self.num_larvae
+
+    def render(self, mode="human", size=400):
+        assert mode in ["human", "rgb_array"], "Invalid mode, must be either \"human\" or \"rgb_array\""
+        if self.canvas_background is None or self.canvas_background.shape[0] != size:
+            # AM in red and OCT in blue over a white dish
+            fields = np.stack([cv2.resize(a_field, (size, size)) for a_field in self.fields])
+            background = np.full((size, size, 3), 255.0)
+            background[..., 1] -= 255 * np.maximum(fields[0], fields[1])
+            background[..., 2] -= 255 * fields[0]
+            background[..., 0] -= 255 * fields[1]
+            background = np.ascontiguousarray(np.clip(background, 0, 255).astype(np.uint8)[::-1])
+            cv2.circle(background, (size // 2, size // 2), size // 2 - 1, (0, 0, 0), 1)
+            self.canvas_background = background
+        canvas = self.canvas_background.copy()
+        pixels = ((self.positions + self.dish_radius) / (2 * self.dish_radius) * (size - 1)).astype(int)
+        canvas[size - 1 - pixels[:, 1], pixels[:, 0]] = 0
+        if mode == "human":
+            self.window = True
+            cv2.imshow("ContinuousPetriDish", canvas[:, :, ::-1])
+            cv2.waitKey(10)
+        elif mode == "rgb_array":
+            return canvas
+
+    def close(self):
+        if self.window:
+            cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    env = ContinuousPetriDishEnv(num_larvae=1000, never_done=True)
+    obs = env.reset()
+    for a_step in range(200):
+        # larvae attracted to AM
+        obs, reward, done, info = env.step(np.ones(env.num_larvae, dtype=int))
+    print("preference index", env.preference_index())
+    env.close()
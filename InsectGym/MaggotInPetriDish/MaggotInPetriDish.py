@@ -2,9 +2,9 @@ import random
 import sys
 from contextlib import closing
 from io import StringIO
-from gym import utils
-from gym.envs.toy_text import discrete
+from InsectGym.Tabular.TabularEnv import TabularEnv, TransitionTable
 import numpy as np
+from InsectGym.Utils.TextGridRenderer import TextGridRenderer
 
 MAP = [
     "          +---------+",
@@ -15,7 +15,14 @@ MAP = [
 ]
 
 
-class MaggotInPetriDishEnv(discrete.DiscreteEnv):
+def generate_map(num_locations):
+    """map layers in the format of MAP for a dish with num_locations locations"""
+    cells = ":".join(" " * num_locations)
+    border = " " * 10 + "+" + "-" * (2 * num_locations - 1) + "+"
+    return [border, "odor      |" + cells + "|", "maggot    |" + cells + "|", "reinforcer|" + cells + "|", border]
+
+
+class MaggotInPetriDishEnv(TabularEnv):
     """
     Maggot In Petri Dish associative learning experiment
     Gerber, B., & Hendel, T. (2006). Outcome expectations drive learned behaviour in larval Drosophila. Proceedings.
@@ -118,11 +125,17 @@ class MaggotInPetriDishEnv(discrete.DiscreteEnv):
     Reward depends on the reinforcer the maggot is on. When the maggot is on fructose, it gets 1 as reward. When the
     maggot is on quinine hemisulphate, it gets -1 as punishment.
 
+    Dish length:
+    num_locations sets the number of locations, with AM on the left half of the dish, OCT on the right half and the
+    middle odor state on the middle location when num_locations is odd. The maggot starts on the middle location, or
+    on either of the two middle locations with equal probability when num_locations is even, so that neither odor
+    is favoured.
+
     state space is represented by:
         (odor state, reinforcer state, location)
     """
 
-    metadata = {"render.modes": ["human", "ansi"]}
+    metadata = {"render.modes": ["human", "ansi", "rgb_array"]}
 
     # fructose, quinine
     def __init__(self, odor=['AM', 'OCT'], reinforcer=['fructose'], num_locations=5, never_done=False):
@@ -141,111 +154,59 @@ class MaggotInPetriDishEnv(discrete.DiscreteEnv):
         self.never_done = never_done
 
         initial_state_distrib = np.zeros(num_states)
-        initial_state_distrib[2] = 1
+        initial_state_distrib[(self.num_locations - 1) // 2] = 1
+        initial_state_distrib[self.num_locations // 2] = 1
         initial_state_distrib /= initial_state_distrib.sum()
 
         num_actions = 5
-        P = {
-            state: {action: [] for action in range(num_actions)}
-            for state in range(num_states)
-        }
-
+        self.mapInit()
+        TabularEnv.__init__(
+            self, num_states, num_actions, self.build_transitions(), initial_state_distrib
+        )
 
-        # done = False
+    def init_args(self):
+        return {'odor': self.odor, 'reinforcer': self.reinforcer, 'num_locations': self.num_locations,
+                'never_done': self.never_done}
 
+    def build_transitions(self):
+        """transition arrays of the dish for any num_locations, with the walls handled by clipping"""
+        locations = np.arange(self.num_locations)
+        left = np.maximum(locations - 1, 0)
+        right = np.minimum(locations + 1, self.num_locations - 1)
+        if 'fructose' in self.reinforcer:
+            reinforcer_reward = 1
+        elif 'quinine' in self.reinforcer:
+            reinforcer_reward = -1
+        else:
+            reinforcer_reward = 0
+        rewards = np.zeros(5, dtype=int)
         if self.odor[0] != self.odor[1]:
-            for a_location in range(self.num_locations):
-                for an_action in range(num_actions):
-                    done = False
-                    new_location = a_location
-                    reward = 0
-                    if an_action == 0:
-                        pass
-                    if 'AM' in self.odor:
-                        if an_action == 1 and a_location != 0:
-                            new_location = a_location - 1
-                        elif an_action == 2 and a_location != 4:
-                            new_location = a_location + 1
-                        if an_action == 1:
-                            if 'fructose' in self.reinforcer:
-                                reward = 1
-                            elif 'quinine' in self.reinforcer:
-                                reward = -1
-                            else:
-                                reward = 0
-                    if 'OCT' in self.odor:
-                        if an_action == 3 and a_location != 4:
-                            new_location = a_location + 1
-                        elif an_action == 4 and a_location != 0:
-                            new_location = a_location - 1
-                        if an_action == 3:
-                            if 'fructose' in self.reinforcer:
-                                reward = 1
-                            elif 'quinine' in self.reinforcer:
-                                reward = -1
-                            else:
-                                reward = 0
-                    if reward==1:
-                        done = True
-                    if self.never_done:
-                        done = False
-                    P[a_location][an_action].append((1.0, new_location, reward, done))
-        if self.odor[0] == self.odor[1]:
-            for a_location in range(self.num_locations):
-                for an_action in range(num_actions):
-                    # if an_action == 1 or an_action == 3:
-                    #     if 'fructose' in self.reinforcer:
-                    #         reward = 1
-                    #     elif 'quinine' in self.reinforcer:
-                    #         reward = -1
-                    #     else:
-                    #         reward = 0
-                    # else:
-                    #     reward = 0
-                    done = False
-                    if an_action == 1 and 'AM' in self.odor:
-                        if 'fructose' in self.reinforcer:
-                            reward = 1
-                        elif 'quinine' in self.reinforcer:
-                            reward = -1
-                        else:
-                            reward = 0
-                    elif an_action == 3 and 'OCT' in self.odor:
-                        if 'fructose' in self.reinforcer:
-                            reward = 1
-                        elif 'quinine' in self.reinforcer:
-                            reward = -1
-                        else:
-                            reward = 0
-                    else:
-                        reward = 0
-                    if reward==1:
-                        done = True
-                    if self.never_done:
-                        done = False
-                    if an_action == 0:
-                        new_location = a_location
-                        P[a_location][an_action].append((1.0, new_location, reward, done))
-                    else:
-                        if a_location == 0:
-                            P[a_location][an_action].append((0.5, a_location, reward, done))
-                            new_location = a_location + 1
-                            P[a_location][an_action].append((0.5, new_location, reward, done))
-                        elif a_location == 4:
-                            new_location = a_location - 1
-                            P[a_location][an_action].append((0.5, new_location, reward, done))
-                            P[a_location][an_action].append((0.5, a_location, reward, done))
-                        else:
-                            new_location = a_location - 1
-                            P[a_location][an_action].append((0.5, new_location, reward, done))
-                            new_location = a_location + 1
-                            P[a_location][an_action].append((0.5, new_location, reward, done))
-
-
-        self.mapInit()
-        discrete.DiscreteEnv.__init__(
-            self, num_states, num_actions, P, initial_state_distrib
-        )
+            # a0 stays, AM: a1 to the left, a2 to the right, OCT: a3 to the right, a4 to the left
+            next_states = np.repeat(locations[:, None], 5, axis=1)
+            if 'AM' in self.odor:
+                next_states[:, 1] = left
+                next_states[:, 2] = right
+                rewards[1] = reinforcer_reward
+            if 'OCT' in self.odor:
+                next_states[:, 3] = right
+                next_states[:, 4] = left
+                rewards[3] = reinforcer_reward
+            probs = np.ones((self.num_locations, 5, 1))
+            next_states = next_states[:, :, None]
+        else:
+            # without an odor gradient, a0 stays and the other actions step randomly to either side
+            if self.odor[0] == 'AM':
+                rewards[1] = reinforcer_reward
+            elif self.odor[0] == 'OCT':
+                rewards[3] = reinforcer_reward
+            probs = np.full((self.num_locations, 5, 2), 0.5)
+            probs[:, 0] = (1, 0)
+            next_states = np.stack([np.repeat(left[:, None], 5, axis=1), np.repeat(right[:, None], 5, axis=1)],
+                                   axis=-1)
+            next_states[:, 0] = locations[:, None]
+        rewards = np.broadcast_to(rewards[None, :, None], probs.shape)
+        dones = np.broadcast_to((rewards == 1) & (not self.never_done), probs.shape)
+        return TransitionTable(probs, next_states, rewards.copy(), dones.copy())
 
     def encode(self, odor, reinforcer, location):
         return location
@@ -270,7 +231,7 @@ class MaggotInPetriDishEnv(discrete.DiscreteEnv):
         return out
 
     def mapInit(self):
-        self.desc = np.asarray(MAP, dtype="c")
+        self.desc = np.asarray(generate_map(self.num_locations), dtype="c")
         self.layer_name_length = 9
         odor_0_letter = 'N'
         odor_1_letter = 'N'
@@ -293,11 +254,15 @@ class MaggotInPetriDishEnv(discrete.DiscreteEnv):
                 odor_0_letter = 'A'
             if 'OCT' in self.odor:
                 odor_1_letter = 'O'
-        self.desc[1, self.layer_name_length + 2] = odor_0_letter
-        self.desc[1, self.layer_name_length + 4] = odor_0_letter
-        self.desc[1, self.layer_name_length + 6] = odor_mid_letter
-        self.desc[1, self.layer_name_length + 8] = odor_1_letter
-        self.desc[1, self.layer_name_length + 10] = odor_1_letter
+        # odor 0 on the left half of the dish, odor 1 on the right half and the mid odor on the middle location
+        for a_loc in range(self.num_locations):
+            if 2 * a_loc + 1 < self.num_locations:
+                odor_letter = odor_0_letter
+            elif 2 * a_loc + 1 > self.num_locations:
+                odor_letter = odor_1_letter
+            else:
+                odor_letter = odor_mid_letter
+            self.desc[1, self.layer_name_length + 2 * (a_loc + 1)] = odor_letter
 
         if 'fructose' in self.reinforcer:
             reinforcer_letter = 'F'
@@ -307,13 +272,14 @@ class MaggotInPetriDishEnv(discrete.DiscreteEnv):
             reinforcer_letter = 'N'
         for a_loc in range(self.num_locations):
             self.desc[3, self.layer_name_length + 2 * (a_loc + 1)] = reinforcer_letter
+        self.renderer = TextGridRenderer(self.desc)
 
     def render(self, mode="human"):
+        patches = [(2, self.layer_name_length + (self.s + 1) * 2, 'm', "yellow", True, False)]
+        if mode == "rgb_array":
+            return self.renderer.render_rgb(patches)
         outfile = StringIO() if mode == "ansi" else sys.stdout
-        out = self.desc.copy().tolist()
-        out = [[c.decode("utf-8") for c in line] for line in out]
-        out[2][self.layer_name_length + (self.s + 1) * 2] = utils.colorize('m', "yellow", highlight=True)
-        outfile.write("\n".join(["".join(row) for row in out]) + "\n")
+        outfile.write(self.renderer.render_text(patches) + "\n")
         # No need to return anything for human
         if mode != "human":
             with closing(outfile):
@@ -0,0 +1,91 @@
+from collections import namedtuple
+import numpy as np
+from gym.utils import seeding
+from InsectGym.MaggotInPetriDish.MaggotInPetriDish import MaggotInPetriDishEnv
+
+PopulationStats = namedtuple('PopulationStats', ['step', 'left', 'middle', 'right', 'preference_index',
+                                                 'mean_reward', 'done_fraction'])
+
+
+def sample_actions(policy, locations, np_random):
+    """
+    actions of a population for a policy given as a callable policy(locations, np_random) or as an (nS, nA) array
+    of action probabilities per location
+    """
+    if callable(policy):
+        return np.asarray(policy(locations, np_random))
+    cumulative = np.cumsum(policy, axis=-1)
+    return (cumulative[locations] > np_random.rand(len(locations))[:, None]).argmax(axis=-1)
+
+
+class MaggotPopulation:
+    """
+    A population of larvae in the same petri dish, for Gerber & Hendel style group experiments.
+
+    The locations of all larvae are kept in one array and stepped together by sampling the TransitionTable of a
+    MaggotInPetriDishEnv, so thousands of larvae cost about as much as one. A larva whose transition is done keeps
+    moving in the dish; dones are only reported. run() streams the side occupancy and the preference index
+        PI = (#left - #right) / #larvae
+    of every step without storing trajectories, the left side being the AM side of the dish.
+    """
+
+    def __init__(self, env=None, num_larvae=30, seed=None, **env_kwargs):
+        self.env = env if env is not None else MaggotInPetriDishEnv(**env_kwargs)
+        self.table = self.env.table
+        self.num_larvae = num_larvae
+        locations = np.arange(self.env.num_locations)
+        # -1 for the left half of the dish, 0 for the middle location, 1 for the right half
+        self.sides = np.sign(2 * locations + 1 - self.env.num_locations)
+        self.seed(seed)
+        self.reset()
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def reset(self):
+        self.locations = self.np_random.choice(self.env.nS, size=self.num_larvae, p=self.env.isd)
+        return self.locations
+
+    def step(self, actions):
+        k = self.table.sample(self.locations, actions, self.np_random.rand(self.num_larvae))
+        rewards = self.table.rewards[self.locations, actions, k]
+        dones = self.table.dones[self.locations, actions, k]
+        self.locations = self.table.next_states[self.locations, actions, k]
+        return self.locations, rewards, dones
+
+    def side_counts(self):
+        """numbers of larvae on the left half, the middle location and the right half of the dish"""
+        left, middle, right = np.bincount(self.sides[self.locations] + 1, minlength=3)
+        return left, middle, right
+
+    def preference_index(self):
+        left, middle, right = self.side_counts()
+        return (left - right) / self.num_larvae
+
+    def run(self, policy, num_steps, reset=True):
+        """generator of the PopulationStats of each step of the population following policy"""
+        if reset:
+            self.reset()
+        for a_step in range(num_steps):
+            actions = sample_actions(policy, self.locations, self.np_random)
+            locations, rewards, dones = self.step(actions)
+            left, middle, right = self.side_counts()
+            yield PopulationStats(a_step, left, middle, right, (left - right) / self.num_larvae,
+                                  rewards.mean(), dones.mean())
+
+    def summarize(self, policy, num_steps, reset=True):
+        """per-step arrays of the PopulationStats fields of a run"""
+        summary = {field: np.zeros(num_steps) for field in PopulationStats._fields}
+        for stats in self.run(policy, num_steps, reset=reset):
+            for field, value in zip(PopulationStats._fields, stats):
+                summary[field][stats.step] = value
+        return summary
+
+
+if __name__ == "__main__":
+    population = MaggotPopulation(num_larvae=30, odor=['AM', 'OCT'], reinforcer=['fructose'], never_done=True)
+    # larvae attracted to AM one time in three, otherwise moving randomly
+    policy = np.tile([0.2, 1 / 3, 0.1, 0.2, 1 / 6], (population.env.nS, 1))
+    for stats in population.run(policy, 20):
+        print(stats)
@@ -0,0 +1,274 @@
+import sys
+from contextlib import closing
+from io import StringIO
+from gym import Env, spaces
+from gym.utils import seeding
+import numpy as np
+from InsectGym.Utils.TextGridRenderer import TextGridRenderer
+from InsectGym.MultiPassengerTaxi.taxi_encoding import encode_states, decode_states, state_occupancy
+from InsectGym.MultiPassengerTaxi.MultiPassengerTaxi import MAP
+from InsectGym.Tabular.TabularEnv import TransitionTable, reachable_states, compaction_arrays
+
+
+class MultiPassengerTaxiMapEnv(Env):
+    """
+    The MultiPassengerTaxi Problem on an arbitrary map with an arbitrary list of passengers.
+
+    Description:
+    Same task as MultiPassengerTaxiEnv (or MultiPassengerTaxiPickEnv with pick_action=True), but the map, the
+    passenger locations, the destination and the rewards are given as arguments. The defaults reproduce
+    MultiPassengerTaxiEnv.
+
+    Transitions are computed on demand from the factored state instead of being enumerated in __init__, so the
+    construction cost does not depend on the number of states, which grows as cells * 2 ** passengers. With
+    memoize=True every computed transition is kept in a table and looked up when it is met again.
+    transition_table() compiles the transitions of all states at once with NumPy, for planners.
+
+    With compact_states=True the states reachable from the start are found by a vectorized breadth-first search and
+    renumbered to 0..R-1, and the observations are these compact indexes. self.compact_to_full and
+    self.full_to_compact map between the two indexings; encode and decode work on the full states.
+
+    Map:
+    A list of strings (or one string with a line per row) in the MultiPassengerTaxi format, where the cell at
+    (row, col) is the character desc[1 + row][2 * col + 1]. Cells marked X can not be entered. If start_loc or
+    dest_loc are not given, they are read from the cells marked S and D.
+
+    Rewards:
+    When the taxi arrives at the destination with k > 0 passengers, the episode ends with reward_options[k - 1].
+    By default reward_options is (1, 3, 15) for three passengers and (1, 2, ..., n) otherwise.
+
+    state space is represented by:
+        (taxi_row, taxi_col, [passenger_1_on, ..., passenger_n_on])
+    """
+
+    metadata = {"render.modes": ["human", "ansi", "rgb_array"]}
+
+    def __init__(self, desc=MAP, locs=((0, 2), (4, 6), (5, 0)), dest_loc=None, start_loc=None,
+                 reward_options=None, pick_action=False, memoize=False, compact_states=False):
+        if isinstance(desc, str):
+            desc = desc.strip("\n").split("\n")
+        self.desc = np.asarray(desc, dtype="c")
+        self.renderer = TextGridRenderer(self.desc)
+        self.num_rows = self.desc.shape[0] - 2
+        self.num_columns = (self.desc.shape[1] - 1) // 2
+        self.max_row = self.num_rows - 1
+        self.max_col = self.num_columns - 1
+        cells = self.desc[1:-1, 1:-1:2]
+        self.blocked = cells == b"X"
+
+        self.locs = [tuple(loc) for loc in locs]
+        self.num_passenger = len(self.locs)
+        self.dest_loc = tuple(dest_loc) if dest_loc is not None else self.find_cell(cells, b"D")
+        self.start_loc = tuple(start_loc) if start_loc is not None else self.find_cell(cells, b"S")
+        if reward_options is None:
+            reward_options = (1, 3, 15) if self.num_passenger == 3 else tuple(range(1, self.num_passenger + 1))
+        assert len(reward_options) == self.num_passenger, "a reward option is needed for each number of passengers"
+        self.reward_options = tuple(reward_options)
+        self.pick_action = pick_action
+        self.memoize = memoize
+        self.memo = {}
+
+        # - 0: move south
+        # - 1: move north
+        # - 2: move east
+        # - 3: move west
+        # - 4: pick up / drop off passenger, if pick_action
+        self.movements = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        self.action_movements = np.array(self.movements + [(0, 0)], dtype=np.int64)
+
+        # bit flags of the passengers waiting at each cell, the first passenger being the most significant bit
+        self.passenger_flags = np.zeros(self.num_rows * self.num_columns, dtype=np.int64)
+        for i, (row, col) in enumerate(self.locs):
+            self.passenger_flags[row * self.num_columns + col] |= 1 << (self.num_passenger - 1 - i)
+        flags = np.arange(2 ** self.num_passenger)
+        self.passenger_counts = np.zeros(len(flags), dtype=np.int64)
+        for i in range(self.num_passenger):
+            self.passenger_counts += (flags >> i) & 1
+        self.arrival_rewards = np.array((0,) + self.reward_options)
+
+        self.num_full_states = self.num_rows * self.num_columns * 2 ** self.num_passenger
+        self.nA = 5 if self.pick_action else 4
+        self.start_state = self.encode(self.start_loc[0], self.start_loc[1], [0] * self.num_passenger)
+        self.compact_to_full = self.full_to_compact = None
+        if compact_states:
+            reachable = reachable_states(self.successors, [self.start_state], self.num_full_states)
+            self.compact_to_full, self.full_to_compact = compaction_arrays(reachable, self.num_full_states)
+            self.nS = len(reachable)
+        else:
+            self.nS = self.num_full_states
+        self.action_space = spaces.Discrete(self.nA)
+        self.observation_space = spaces.Discrete(self.nS)
+        self.lastaction = None
+        self.seed()
+        self.s = int(self.compact_state(self.start_state))
+
+    @staticmethod
+    def find_cell(cells, letter):
+        found = np.argwhere(cells == letter)
+        assert len(found) > 0, "the map has no cell marked " + letter.decode("utf-8")
+        return tuple(found[0].tolist())
+
+    def to_schema(self):
+        """the env is defined by the arguments it was made with, and its current state"""
+        return {'desc': [row.tobytes().decode("utf-8") for row in self.desc], 'locs': self.locs,
+                'dest_loc': self.dest_loc, 'start_loc': self.start_loc, 'reward_options': self.reward_options,
+                'pick_action': self.pick_action, 'memoize': self.memoize,
+                'compact_states': self.compact_to_full is not None, 's': int(self.s)}
+
+    @classmethod
+    def from_schema(cls, fields):
+        fields = dict(fields)
+        s = fields.pop('s')
+        env = cls(**fields)
+        env.s = s
+        return env
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def encode(self, taxi_row, taxi_col, pass_on):
+        i = taxi_row * self.num_columns + taxi_col
+        for a_pass_on in pass_on:
+            i = i * 2 + a_pass_on
+        assert 0 <= i
+        return i
+
+    def decode(self, i):
+        pass_on = [(i >> (self.num_passenger - 1 - p)) & 1 for p in range(self.num_passenger)]
+        taxi_row, taxi_col = divmod(i >> self.num_passenger, self.num_columns)
+        assert 0 <= taxi_row < self.num_rows
+        return taxi_row, taxi_col, pass_on
+
+    def transitions(self, states, actions):
+        """deterministic next states, rewards and dones of arrays of states and actions"""
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        pass_on = states & (2 ** self.num_passenger - 1)
+        row, col = np.divmod(states >> self.num_passenger, self.num_columns)
+        new_row = np.clip(row + self.action_movements[actions, 0], 0, self.max_row)
+        new_col = np.clip(col + self.action_movements[actions, 1], 0, self.max_col)
+        blocked = self.blocked[new_row, new_col]
+        new_row = np.where(blocked, row, new_row)
+        new_col = np.where(blocked, col, new_col)
+        if self.pick_action:
+            # passengers at the taxi's cell toggle between waiting and on board
+            toggled = np.where(actions == 4, self.passenger_flags[row * self.num_columns + col], 0)
+            new_pass_on = pass_on ^ toggled
+        else:
+            # passengers waiting at the cell the taxi arrives at are picked up
+            new_pass_on = pass_on | self.passenger_flags[new_row * self.num_columns + new_col]
+        num_pass_on = self.passenger_counts[new_pass_on]
+        done = (new_row == self.dest_loc[0]) & (new_col == self.dest_loc[1]) & (num_pass_on > 0)
+        reward = np.where(done, self.arrival_rewards[num_pass_on], 0)
+        new_states = ((new_row * self.num_columns + new_col) << self.num_passenger) | new_pass_on
+        return new_states, reward, done
+
+    def successors(self, states):
+        """full states that can follow an array of full states under any action"""
+        states = np.asarray(states)
+        return self.transitions(np.repeat(states, self.nA), np.tile(np.arange(self.nA), len(states)))[0]
+
+    def full_state(self, s):
+        """index of a state (or array of states) in the full state space"""
+        return s if self.compact_to_full is None else self.compact_to_full[s]
+
+    def compact_state(self, s):
+        """index of a full state (or array of full states) in the state space of the env"""
+        return s if self.full_to_compact is None else self.full_to_compact[s]
+
+    def transition(self, state, action):
+        """next full state, reward and done of a single full state and action, memoized if enabled"""
+        if self.memoize and (state, action) in self.memo:
+            return self.memo[(state, action)]
+        new_states, reward, done = self.transitions([state], [action])
+        result = (int(new_states[0]), reward[0].item(), bool(done[0]))
+        if self.memoize:
+            self.memo[(state, action)] = result
+        return result
+
+    def transition_table(self):
+        """compile the transitions of every state of the env into a TransitionTable"""
+        states = self.full_state(np.repeat(np.arange(self.nS), self.nA))
+        actions = np.tile(np.arange(self.nA), self.nS)
+        new_states, reward, done = self.transitions(states, actions)
+        new_states = self.compact_state(new_states)
+        shape = (self.nS, self.nA, 1)
+        return TransitionTable(np.ones(shape), new_states.reshape(shape), reward.reshape(shape), done.reshape(shape))
+
+    def reset(self):
+        self.s = int(self.compact_state(self.start_state))
+        self.lastaction = None
+        return int(self.s)
+
+    def step(self, a):
+        s, r, d = self.transition(int(self.full_state(self.s)), a)
+        self.s = int(self.compact_state(s))
+        self.lastaction = a
+        return (self.s, r, d, {"prob": 1.0})
+
+    def encode_array(self, taxi_rows, taxi_cols, pass_on):
+        """encode whole arrays at once, pass_on having a trailing axis with a flag per passenger"""
+        return encode_states(taxi_rows, taxi_cols, pass_on, self.num_columns)
+
+    def decode_array(self, states):
+        """decode a whole array of states into arrays of taxi rows, taxi columns and passenger flags"""
+        return decode_states(states, self.num_columns, self.num_passenger)
+
+    def occupancy_maps(self, states):
+        """visit counts of an array of states, as a (row, col) map per passenger configuration"""
+        return state_occupancy(states, self.num_rows, self.num_columns, self.num_passenger)
+
+    def render(self, mode="human"):
+        taxi_row, taxi_col, pass_on = self.decode(int(self.full_state(self.s)))
+        taxi_char = self.desc[1 + taxi_row, 2 * taxi_col + 1].decode("utf-8")
+
+        if sum(pass_on):  # passenger in taxi
+            patches = [(1 + taxi_row, 2 * taxi_col + 1, "_" if taxi_char == " " else taxi_char, "green", True, False)]
+        else:
+            patches = [(1 + taxi_row, 2 * taxi_col + 1, None, "yellow", True, False)]
+
+        for i in range(len(pass_on)):
+            if not pass_on[i]:
+                pi, pj = self.locs[i]
+                patches.append((1 + pi, 2 * pj + 1, None, "blue", False, True))
+
+        di, dj = self.dest_loc
+        patches.append((1 + di, 2 * dj + 1, None, "magenta", False, False))
+        if mode == "rgb_array":
+            return self.renderer.render_rgb(patches)
+
+        outfile = StringIO() if mode == "ansi" else sys.stdout
+        outfile.write(self.renderer.render_text(patches) + "\n")
+        if self.lastaction is not None:
+            outfile.write(
+                "  ({})\n".format(
+                    ["South", "North", "East", "West", "Pick/Drop"][
+                        self.lastaction
+                    ]
+                )
+            )
+        else:
+            outfile.write("\n")
+
+        # No need to return anything for human
+        if mode != "human":
+            with closing(outfile):
+                return outfile.getvalue()
+
+
+if __name__ == "__main__":
+    env = MultiPassengerTaxiMapEnv()
+    obs = env.reset()
+    while True:
+        # Take a random action
+        action = env.action_space.sample()
+        obs, reward, done, info = env.step(action)
+
+        # Render the game
+        env.render()
+
+        if done:
+            break
+
+    env.close()
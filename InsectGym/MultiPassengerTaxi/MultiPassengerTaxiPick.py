@@ -1,9 +1,10 @@
 import sys
 from contextlib import closing
 from io import StringIO
-from gym import utils
-from gym.envs.toy_text import discrete
+from InsectGym.Tabular.TabularEnv import TabularEnv
 import numpy as np
+from InsectGym.Utils.TextGridRenderer import TextGridRenderer
+from InsectGym.MultiPassengerTaxi.taxi_encoding import encode_states, decode_states, state_occupancy
 
 MAP = [
     "+-------------+",
@@ -24,7 +25,7 @@ MAP = [
 #           [1, 1, 1, 1, 1, 1, 1],
 #           [1, 1, 1, 1, 1, 1, 0]]
 
-class MultiPassengerTaxiPickEnv(discrete.DiscreteEnv):
+class MultiPassengerTaxiPickEnv(TabularEnv):
     """
     The MultiPassengerTaxi Problem
     from "Dearden, R., Friedman, N. and Russell, S. (1998) ‘Bayesian Q-learning’, Proceedings of the National Conference on Artificial Intelligence, pp. 761–768."
@@ -64,18 +65,22 @@ class MultiPassengerTaxiPickEnv(discrete.DiscreteEnv):
 
     state space is represented by:
         (taxi_row, taxi_col, [passenger_1_on, passenger_2_on, passenger_3_on])
+
+    With compact_states=True the unreachable states are dropped and the observations are indexes into the R
+    reachable states; encode and decode still work on the full states, see TabularEnv.full_state.
     """
 
-    metadata = {"render.modes": ["human", "ansi"]}
+    metadata = {"render.modes": ["human", "ansi", "rgb_array"]}
 
-    def __init__(self):
+    def __init__(self, compact_states=False):
         self.desc = np.asarray(MAP, dtype="c")
+        self.renderer = TextGridRenderer(self.desc)
 
         # self.locs = locs = [(0, 0), (0, 4), (4, 0), (4, 3)]
         self.locs = locs = [(0, 2), (4, 6), (5, 0)]
         self.dest_loc = (0, 6)
         self.reward_options = (1, 3, 15)  # (0, 3, 15)
-        num_passenger = 3
+        self.num_passenger = num_passenger = 3
         self.num_rows = 6
         self.num_columns = 7
         self.max_row = self.num_rows - 1
@@ -149,10 +154,13 @@ class MultiPassengerTaxiPickEnv(discrete.DiscreteEnv):
                                 )
                                 P[state][action].append((1.0, new_state, reward, done))
 
-        discrete.DiscreteEnv.__init__(
-            self, num_states, num_actions, P, initial_state_distrib
+        TabularEnv.__init__(
+            self, num_states, num_actions, P, initial_state_distrib, compact_states=compact_states
         )
 
+    def init_args(self):
+        return {'compact_states': self.compact_to_full is not None}
+
     def encode(self, taxi_row, taxi_col, pass_on):
         # 6 7, [2,2,2]
         # pass_on=[1,0,1]
@@ -184,35 +192,39 @@ class MultiPassengerTaxiPickEnv(discrete.DiscreteEnv):
         assert 0 <= i < self.num_rows
         return reversed(out)
 
-    def render(self, mode="human"):
-        outfile = StringIO() if mode == "ansi" else sys.stdout
+    def encode_array(self, taxi_rows, taxi_cols, pass_on):
+        """encode whole arrays at once, pass_on having a trailing axis with a flag per passenger"""
+        return encode_states(taxi_rows, taxi_cols, pass_on, self.num_columns)
 
-        out = self.desc.copy().tolist()
-        out = [[c.decode("utf-8") for c in line] for line in out]
-        taxi_row, taxi_col, pass_on = self.decode(self.s)
+    def decode_array(self, states):
+        """decode a whole array of states into arrays of taxi rows, taxi columns and passenger flags"""
+        return decode_states(states, self.num_columns, self.num_passenger)
 
-        def ul(x):
-            return "_" if x == " " else x
+    def occupancy_maps(self, states):
+        """visit counts of an array of states, as a (row, col) map per passenger configuration"""
+        return state_occupancy(states, self.num_rows, self.num_columns, self.num_passenger)
 
+    def render(self, mode="human"):
+        taxi_row, taxi_col, pass_on = self.decode(self.full_state(self.s))
+        taxi_char = self.desc[1 + taxi_row, 2 * taxi_col + 1].decode("utf-8")
 
         if sum(pass_on):  # passenger in taxi
-            out[1 + taxi_row][2 * taxi_col + 1] = utils.colorize(
-                ul(out[1 + taxi_row][2 * taxi_col + 1]), "green", highlight=True
-            )
+            patches = [(1 + taxi_row, 2 * taxi_col + 1, "_" if taxi_char == " " else taxi_char, "green", True, False)]
         else:
-            out[1 + taxi_row][2 * taxi_col + 1] = utils.colorize(
-                out[1 + taxi_row][2 * taxi_col + 1], "yellow", highlight=True
-            )
+            patches = [(1 + taxi_row, 2 * taxi_col + 1, None, "yellow", True, False)]
 
         for i in range(len(pass_on)):
             if not pass_on[i]:
                 pi, pj = self.locs[i]
-                out[1 + pi][2 * pj + 1] = utils.colorize(
-                    out[1 + pi][2 * pj + 1], "blue", bold=True)
+                patches.append((1 + pi, 2 * pj + 1, None, "blue", False, True))
 
         di, dj = self.dest_loc
-        out[1 + di][2 * dj + 1] = utils.colorize(out[1 + di][2 * dj + 1], "magenta")
-        outfile.write("\n".join(["".join(row) for row in out]) + "\n")
+        patches.append((1 + di, 2 * dj + 1, None, "magenta", False, False))
+        if mode == "rgb_array":
+            return self.renderer.render_rgb(patches)
+
+        outfile = StringIO() if mode == "ansi" else sys.stdout
+        outfile.write(self.renderer.render_text(patches) + "\n")
         if self.lastaction is not None:
             outfile.write(
                 "  ({})\n".format(
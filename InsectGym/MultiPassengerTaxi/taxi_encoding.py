@@ -0,0 +1,48 @@
+import numpy as np
+
+"""
+Array versions of the MultiPassengerTaxi state encoding
+
+    state = ((taxi_row * num_columns + taxi_col) * 2 + pass_on[0]) * 2 + ... + pass_on[n - 1]
+
+so the passenger flags are the n lowest bits of the state, with the first passenger as the most significant one.
+The flags are packed and unpacked with np.packbits / np.unpackbits, and the taxi cell is split with divmod.
+"""
+
+
+def encode_states(taxi_rows, taxi_cols, pass_on, num_columns):
+    """
+    encode arrays of taxi rows and columns and an array of passenger flags with a trailing axis of length n into
+    an array of states
+    """
+    pass_on = np.asarray(pass_on, dtype=np.uint8)
+    num_passenger = pass_on.shape[-1]
+    packed = np.packbits(pass_on, axis=-1)
+    flags = np.zeros(packed.shape[:-1], dtype=np.int64)
+    for a_byte in range(packed.shape[-1]):
+        flags = (flags << 8) | packed[..., a_byte]
+    flags >>= 8 * packed.shape[-1] - num_passenger
+    cells = np.asarray(taxi_rows, dtype=np.int64) * num_columns + np.asarray(taxi_cols, dtype=np.int64)
+    return (cells << num_passenger) | flags
+
+
+def decode_states(states, num_columns, num_passenger):
+    """
+    decode an array of states into arrays of taxi rows, taxi columns and passenger flags, the flags having an extra
+    trailing axis of length num_passenger
+    """
+    states = np.asarray(states, dtype=np.int64)
+    num_bytes = (num_passenger + 7) // 8
+    flags = (states & (2 ** num_passenger - 1)) << (8 * num_bytes - num_passenger)
+    shifts = 8 * np.arange(num_bytes - 1, -1, -1)
+    packed = ((flags[..., None] >> shifts) & 0xFF).astype(np.uint8)
+    pass_on = np.unpackbits(packed, axis=-1, count=num_passenger)
+    taxi_rows, taxi_cols = np.divmod(states >> num_passenger, num_columns)
+    return taxi_rows, taxi_cols, pass_on
+
+
+def state_occupancy(states, num_rows, num_columns, num_passenger):
+    """visit counts of an array of states as maps of shape (2 ** num_passenger, num_rows, num_columns)"""
+    num_states = num_rows * num_columns * 2 ** num_passenger
+    counts = np.bincount(np.ravel(states), minlength=num_states)
+    return counts.reshape(num_rows, num_columns, 2 ** num_passenger).transpose(2, 0, 1)
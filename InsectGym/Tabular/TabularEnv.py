@@ -0,0 +1,214 @@
+import numpy as np
+from gym.envs.toy_text import discrete
+
+
+def reachable_states(successors, initial_states, nS):
+    """
+    breadth-first search of the states reachable from initial_states, where successors(states) returns an array of
+    the states that can follow an array of states; returns the sorted array of reachable states
+    """
+    reached = np.zeros(nS, dtype=bool)
+    frontier = np.unique(np.asarray(initial_states, dtype=np.intp))
+    reached[frontier] = True
+    while frontier.size:
+        frontier = np.unique(successors(frontier))
+        frontier = frontier[~reached[frontier]]
+        reached[frontier] = True
+    return np.flatnonzero(reached)
+
+
+def compaction_arrays(reachable, nS):
+    """
+    forward and backward lookup arrays between the full state space and a dense 0..R-1 indexing of the reachable
+    states; unreachable states map to -1
+    """
+    compact_to_full = np.asarray(reachable, dtype=np.intp)
+    full_to_compact = np.full(nS, -1, dtype=np.intp)
+    full_to_compact[compact_to_full] = np.arange(len(compact_to_full))
+    return compact_to_full, full_to_compact
+
+
+class TransitionTable:
+    """
+    Dense array form of the DiscreteEnv transition dictionary
+        P[s][a] == [(probability, nextstate, reward, done), ...]
+
+    Every field is stored as an array of shape (nS, nA, K), where K is the largest number of outcomes of any
+    (state, action) pair. Missing outcomes are padded with probability 0, lead back to the same state and are never
+    sampled. The arrays are read-only, so they can be handed to planners and shared between envs without copying.
+    """
+
+    def __init__(self, probs, next_states, rewards, dones):
+        self.probs = np.asarray(probs, dtype=np.float64)
+        self.next_states = np.asarray(next_states, dtype=np.intp)
+        self.rewards = np.asarray(rewards)
+        self.dones = np.asarray(dones, dtype=bool)
+        assert self.probs.ndim == 3, "transition arrays must have the shape (nS, nA, K)"
+        assert self.probs.shape == self.next_states.shape == self.rewards.shape == self.dones.shape
+        self.cumulative_probs = np.cumsum(self.probs, axis=-1)
+        for an_array in self.arrays() + (self.cumulative_probs,):
+            an_array.flags.writeable = False
+
+    @property
+    def nS(self):
+        return self.probs.shape[0]
+
+    @property
+    def nA(self):
+        return self.probs.shape[1]
+
+    @property
+    def K(self):
+        return self.probs.shape[2]
+
+    @classmethod
+    def from_P(cls, P, nS, nA):
+        """compile a transition dictionary into dense arrays"""
+        K = max(len(P[state][action]) for state in range(nS) for action in range(nA))
+        probs = np.zeros((nS, nA, K))
+        next_states = np.repeat(np.arange(nS), nA * K).reshape(nS, nA, K)
+        rewards = [[[0] * K for action in range(nA)] for state in range(nS)]
+        dones = np.zeros((nS, nA, K), dtype=bool)
+        for state in range(nS):
+            for action in range(nA):
+                for k, (prob, next_state, reward, done) in enumerate(P[state][action]):
+                    probs[state, action, k] = prob
+                    next_states[state, action, k] = next_state
+                    rewards[state][action][k] = reward
+                    dones[state, action, k] = done
+        return cls(probs, next_states, np.array(rewards), dones)
+
+    def successors(self, states):
+        """states that can follow an array of states under any action"""
+        return self.next_states[states][self.probs[states] > 0]
+
+    def compact(self, compact_to_full, full_to_compact):
+        """the table restricted to the states in compact_to_full, with the states renumbered to compact indexes"""
+        next_states = full_to_compact[self.next_states[compact_to_full]]
+        assert np.all(next_states >= 0), "the kept states are not closed under the transitions"
+        return TransitionTable(self.probs[compact_to_full], next_states, self.rewards[compact_to_full],
+                               self.dones[compact_to_full])
+
+    def to_P(self):
+        """expand the arrays back into a transition dictionary, dropping the padded outcomes"""
+        outcome_nums = self.K - np.argmax(self.probs[:, :, ::-1] > 0, axis=-1)
+        outcome_nums[~np.any(self.probs > 0, axis=-1)] = 1
+        P = {}
+        for state in range(self.nS):
+            P[state] = {}
+            for action in range(self.nA):
+                P[state][action] = [(self.probs[state, action, k].item(), self.next_states[state, action, k].item(),
+                                     self.rewards[state, action, k].item(), self.dones[state, action, k].item())
+                                    for k in range(outcome_nums[state, action])]
+        return P
+
+    def to_schema(self):
+        return {'probs': self.probs, 'next_states': self.next_states, 'rewards': self.rewards, 'dones': self.dones}
+
+    @classmethod
+    def from_schema(cls, fields):
+        return cls(**fields)
+
+    def arrays(self):
+        """the (probs, next_states, rewards, dones) arrays themselves, without copying"""
+        return self.probs, self.next_states, self.rewards, self.dones
+
+    def sample(self, states, actions, uniforms):
+        """
+        index of the sampled outcome for each (state, action) pair given uniform random numbers in [0, 1),
+        following the same rule as discrete.categorical_sample
+        """
+        uniforms = np.asarray(uniforms)
+        return (self.cumulative_probs[states, actions] > uniforms[..., None]).argmax(axis=-1)
+
+
+class TabularEnv(discrete.DiscreteEnv):
+    """
+    DiscreteEnv backed by a TransitionTable.
+
+    P can be given either as the usual transition dictionary, which is compiled once, or directly as a
+    TransitionTable, in which case the dictionary is only built if self.P is accessed. Stepping samples from the
+    arrays, consuming the random numbers in the same way as DiscreteEnv, so seeded runs are reproduced exactly.
+
+    With compact_states=True only the states reachable from the initial state distribution are kept and renumbered
+    to 0..R-1, which shrinks nS, P, the table and the observation space. self.compact_to_full and
+    self.full_to_compact map between the two indexings (unreachable states map to -1); encode/decode of the
+    subclasses keep working on full states, see full_state and compact_state.
+    """
+
+    def __init__(self, nS, nA, P, isd, compact_states=False):
+        if isinstance(P, TransitionTable):
+            self.table = P
+            P = None
+        else:
+            self.table = TransitionTable.from_P(P, nS, nA)
+        assert self.table.nS == nS and self.table.nA == nA, "transition table does not match nS and nA"
+        self.compact_to_full = self.full_to_compact = None
+        if compact_states:
+            reachable = reachable_states(self.table.successors, np.flatnonzero(np.asarray(isd) > 0), nS)
+            self.compact_to_full, self.full_to_compact = compaction_arrays(reachable, nS)
+            self.table = self.table.compact(self.compact_to_full, self.full_to_compact)
+            isd = np.asarray(isd)[self.compact_to_full]
+            nS = len(reachable)
+            P = None
+        discrete.DiscreteEnv.__init__(self, nS, nA, P, isd)
+
+    @property
+    def P(self):
+        if self._P is None:
+            self._P = self.table.to_P()
+        return self._P
+
+    @P.setter
+    def P(self, P):
+        self._P = P
+
+    def full_state(self, s):
+        """index of a state (or array of states) in the full state space"""
+        return s if self.compact_to_full is None else self.compact_to_full[s]
+
+    def compact_state(self, s):
+        """index of a full state (or array of full states) in the state space of the env"""
+        return s if self.full_to_compact is None else self.full_to_compact[s]
+
+    def step(self, a):
+        k = self.table.sample(self.s, a, self.np_random.rand())
+        p = self.table.probs[self.s, a, k].item()
+        r = self.table.rewards[self.s, a, k].item()
+        d = self.table.dones[self.s, a, k].item()
+        self.s = self.table.next_states[self.s, a, k].item()
+        self.lastaction = a
+        return (int(self.s), r, d, {"prob": p})
+
+    def step_batch(self, states, actions):
+        """
+        step many independent copies of the env at once without touching self.s;
+        returns arrays of next states, rewards, dones and the probabilities of the sampled outcomes
+        """
+        states = np.asarray(states)
+        actions = np.asarray(actions)
+        k = self.table.sample(states, actions, self.np_random.rand(*np.broadcast(states, actions).shape))
+        return (self.table.next_states[states, actions, k], self.table.rewards[states, actions, k],
+                self.table.dones[states, actions, k], self.table.probs[states, actions, k])
+
+    def transition_arrays(self):
+        """zero-copy export of the (probs, next_states, rewards, dones) arrays of shape (nS, nA, K) for planners"""
+        return self.table.arrays()
+
+    def init_args(self):
+        """the arguments of the constructor that make the env again, the subclasses give their own"""
+        return {'nS': self.nS, 'nA': self.nA, 'P': self.table, 'isd': self.isd}
+
+    def to_schema(self):
+        """the env is defined by the arguments it was made with, and its current state"""
+        fields = dict(self.init_args())
+        fields['s'] = int(self.s)
+        return fields
+
+    @classmethod
+    def from_schema(cls, fields):
+        fields = dict(fields)
+        s = fields.pop('s')
+        env = cls(**fields)
+        env.s = s
+        return env
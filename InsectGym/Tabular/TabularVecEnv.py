@@ -0,0 +1,80 @@
+import numpy as np
+from gym.utils import seeding
+from gym.vector import VectorEnv
+from InsectGym.Tabular.solvers import transition_table
+
+
+class TabularVecEnv(VectorEnv):
+    """
+    num_envs copies of a discrete env stepped together by sampling its TransitionTable: a TabularEnv, a
+    MultiPassengerTaxiMapEnv or a VoronoiWorld (for the goals it has when the TransitionTable is compiled).
+
+    All copies share the one table of env, so the cost of a copy is a state and a step counter. The copies start
+    from the initial state distribution of env (isd, or the state reset returns for the envs without one). Copies
+    that are done, or that have been stepped max_episode_steps times, are reset in the same step and the
+    observations returned are the start states of the new episodes; the infos of these copies have the last states
+    of the episodes as 'terminal_observation', and 'TimeLimit.truncated' for the ones stopped by max_episode_steps,
+    as with the TimeLimit wrapper.
+    """
+
+    def __init__(self, env, num_envs, max_episode_steps=None, seed=None):
+        env = getattr(env, 'unwrapped', env)
+        super(TabularVecEnv, self).__init__(num_envs, env.observation_space, env.action_space)
+        self.env = env
+        self.table = transition_table(env)
+        isd = getattr(env, 'isd', None)
+        if isd is None:
+            isd = np.zeros(self.table.nS)
+            isd[env.reset()] = 1
+        self.cumulative_isd = np.cumsum(isd)
+        self.max_episode_steps = max_episode_steps
+        self.states = np.zeros(num_envs, dtype=int)
+        self.elapsed = np.zeros(num_envs, dtype=int)
+        self.actions = None
+        self.seed(seed)
+
+    @classmethod
+    def from_spec(cls, spec, num_envs, seed=None, **kwargs):
+        """the copies of the env registered as spec, made with kwargs"""
+        return cls(spec.make(**kwargs), num_envs, spec.max_episode_steps, seed)
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def reset_games(self, games):
+        """start new episodes in games, drawing their states from the initial state distribution"""
+        uniforms = self.np_random.rand(len(games))
+        self.states[games] = (self.cumulative_isd > uniforms[:, None]).argmax(axis=1)
+        self.elapsed[games] = 0
+
+    def reset_wait(self, **kwargs):
+        self.reset_games(np.arange(self.num_envs))
+        return self.states.copy()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions)
+
+    def step_wait(self, **kwargs):
+        states, actions = self.states, self.actions
+        k = self.table.sample(states, actions, self.np_random.rand(self.num_envs))
+        rewards = self.table.rewards[states, actions, k]
+        dones = self.table.dones[states, actions, k].copy()
+        probs = self.table.probs[states, actions, k]
+        self.states = self.table.next_states[states, actions, k]
+        self.elapsed += 1
+        infos = [{"prob": p} for p in probs.tolist()]
+        if self.max_episode_steps is not None:
+            truncated = ~dones & (self.elapsed >= self.max_episode_steps)
+            for a_game in np.flatnonzero(truncated):
+                infos[a_game]['TimeLimit.truncated'] = True
+            dones |= truncated
+        if np.any(dones):
+            games = np.flatnonzero(dones)
+            for a_game, a_state in zip(games.tolist(), self.states[games].tolist()):
+                infos[a_game]['terminal_observation'] = a_state
+            self.reset_games(games)
+        return self.states.copy(), rewards, dones, infos
+
+    def close_extras(self, **kwargs):
+        pass
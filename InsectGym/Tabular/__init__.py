@@ -0,0 +1,2 @@
+from InsectGym.Tabular.TabularEnv import TabularEnv, TransitionTable, reachable_states, compaction_arrays
+from InsectGym.Tabular.TabularVecEnv import TabularVecEnv
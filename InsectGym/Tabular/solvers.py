@@ -0,0 +1,157 @@
+import hashlib
+import os
+from collections import namedtuple
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.linalg import spsolve
+from InsectGym.Tabular.TabularEnv import TabularEnv
+
+"""
+Dynamic programming solvers for the discrete InsectGym envs.
+
+They work on the (nS, nA, K) arrays of a TransitionTable:
+    -value iteration
+    -policy iteration, evaluating each policy by sweeps over the arrays
+    -sparse policy iteration, evaluating each policy exactly with a scipy.sparse linear solve
+
+and return a Solution of the state values V, the action values Q and the greedy policy. Outcomes marked done do
+not bootstrap. solve() caches solutions by the content of the transition table, so the same task is only solved
+once per process (and once overall with a cache_dir), whichever env instance it comes from.
+"""
+
+Solution = namedtuple('Solution', ['V', 'Q', 'policy'])
+
+solution_cache = {}
+
+
+def transition_table(env):
+    """the TransitionTable of a TabularEnv, a MultiPassengerTaxiMapEnv or a VoronoiWorld (for its current goals)"""
+    env = getattr(env, 'unwrapped', env)
+    if isinstance(env, TabularEnv):
+        return env.table
+    return env.transition_table()
+
+
+def expected_rewards(table):
+    """expected immediate reward of each (state, action), shape (nS, nA)"""
+    return np.sum(table.probs * table.rewards, axis=-1)
+
+
+def q_values(table, V, gamma, rewards=None):
+    """one-step lookahead Q(s, a) = E[r + gamma * (1 - done) * V(s')]"""
+    if rewards is None:
+        rewards = expected_rewards(table)
+    continuation = table.probs * ~table.dones
+    return rewards + gamma * np.sum(continuation * V[table.next_states], axis=-1)
+
+
+def value_iteration(table, gamma=0.99, tol=1e-8, max_iterations=100000):
+    rewards = expected_rewards(table)
+    V = np.zeros(table.nS)
+    for iteration in range(max_iterations):
+        Q = q_values(table, V, gamma, rewards)
+        new_V = Q.max(axis=1)
+        converged = np.max(np.abs(new_V - V)) < tol
+        V = new_V
+        if converged:
+            break
+    Q = q_values(table, V, gamma, rewards)
+    return Solution(V, Q, Q.argmax(axis=1))
+
+
+def evaluate_policy(table, policy, gamma=0.99, tol=1e-8, max_iterations=100000, V=None):
+    """state values of a deterministic policy by sweeps over the arrays of the chosen actions"""
+    states = np.arange(table.nS)
+    probs = table.probs[states, policy]
+    continuation = probs * ~table.dones[states, policy]
+    next_states = table.next_states[states, policy]
+    rewards = np.sum(probs * table.rewards[states, policy], axis=-1)
+    V = np.zeros(table.nS) if V is None else V
+    for iteration in range(max_iterations):
+        new_V = rewards + gamma * np.sum(continuation * V[next_states], axis=-1)
+        converged = np.max(np.abs(new_V - V)) < tol
+        V = new_V
+        if converged:
+            break
+    return V
+
+
+def evaluate_policy_sparse(table, policy, gamma=0.99):
+    """state values of a deterministic policy by solving (I - gamma * P_policy) V = r_policy with scipy.sparse"""
+    states = np.arange(table.nS)
+    probs = table.probs[states, policy]
+    continuation = probs * ~table.dones[states, policy]
+    rewards = np.sum(probs * table.rewards[states, policy], axis=-1)
+    rows = np.repeat(states, table.K)
+    P_policy = sparse.csr_matrix((continuation.ravel(), (rows, table.next_states[states, policy].ravel())),
+                                 shape=(table.nS, table.nS))
+    A = sparse.identity(table.nS, format='csr') - gamma * P_policy
+    return spsolve(A.tocsc(), rewards)
+
+
+def policy_iteration(table, gamma=0.99, tol=1e-8, max_iterations=1000, sparse_evaluation=False):
+    rewards = expected_rewards(table)
+    policy = np.zeros(table.nS, dtype=np.intp)
+    V = np.zeros(table.nS)
+    for iteration in range(max_iterations):
+        if sparse_evaluation:
+            V = evaluate_policy_sparse(table, policy, gamma)
+        else:
+            V = evaluate_policy(table, policy, gamma, tol, V=V)
+        Q = q_values(table, V, gamma, rewards)
+        # keep the current action on ties so that the iteration terminates
+        new_policy = Q.argmax(axis=1)
+        keep = Q[np.arange(table.nS), policy] >= Q[np.arange(table.nS), new_policy] - tol
+        new_policy[keep] = policy[keep]
+        if np.array_equal(new_policy, policy):
+            break
+        policy = new_policy
+    return Solution(V, Q, policy)
+
+
+def sparse_policy_iteration(table, gamma=0.99, tol=1e-8, max_iterations=1000):
+    """policy iteration with exact sparse policy evaluation, gamma must be < 1 unless every policy terminates"""
+    return policy_iteration(table, gamma, tol, max_iterations, sparse_evaluation=True)
+
+
+solvers = {
+    'value_iteration': value_iteration,
+    'policy_iteration': policy_iteration,
+    'sparse_policy_iteration': sparse_policy_iteration,
+}
+
+
+def table_key(table, method, **kwargs):
+    digest = hashlib.sha1()
+    for an_array in table.arrays():
+        digest.update(str((an_array.dtype, an_array.shape)).encode())
+        digest.update(np.ascontiguousarray(an_array).tobytes())
+    digest.update(repr((method, sorted(kwargs.items()))).encode())
+    return digest.hexdigest()
+
+
+def solve(env, method='value_iteration', gamma=0.99, cache_dir=None, **kwargs):
+    """
+    solve an env (or a TransitionTable) with one of the solvers, reusing the cached solution of an identical
+    transition table if there is one; with cache_dir, solutions are also stored there as .npz files. The arrays of
+    the solution are shared with every later solve of the same table, so they are read-only; copy them to change them
+    """
+    table = env if hasattr(env, 'arrays') else transition_table(env)
+    kwargs['gamma'] = gamma
+    key = table_key(table, method, **kwargs)
+    if key in solution_cache:
+        return solution_cache[key]
+    path = os.path.join(cache_dir, key + '.npz') if cache_dir is not None else None
+    if path is not None and os.path.exists(path):
+        with np.load(path) as data:
+            solution = Solution(data['V'], data['Q'], data['policy'])
+    else:
+        solution = solvers[method](table, **kwargs)
+        if path is not None:
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            np.savez(path, V=solution.V, Q=solution.Q, policy=solution.policy)
+    for an_array in solution:
+        an_array.flags.writeable = False
+    solution_cache[key] = solution
+    return solution
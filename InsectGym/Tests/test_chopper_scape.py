@@ -0,0 +1,198 @@
+import random
+import numpy as np
+import cv2
+from InsectGym.ChopperScape.ChopperScape import ChopperScape, SpriteCanvas, load_sprite, font, chopper_size
+
+"""
+Regression tests of ChopperScape: the entity arrays against the object-per-entity engine they replaced, the
+dirty-rectangle canvases against full redraws, and frame skipping against repeated steps.
+
+ChopperScape draws from the global random generator, so two envs are stepped in lockstep by Lockstep, which gives
+each of them its own state of the generator.
+"""
+
+
+class Lockstep:
+    def __init__(self, seed, num_envs=2):
+        random.seed(seed)
+        self.states = [random.getstate()] * num_envs
+
+    def call(self, index, function, *args):
+        random.setstate(self.states[index])
+        result = function(*args)
+        self.states[index] = random.getstate()
+        return result
+
+
+class ReferenceEntity:
+    def __init__(self, file_name, size, x, y, x_max, x_min, y_max, y_min):
+        self.file_name = file_name
+        self.size = size
+        self.x_max, self.x_min, self.y_max, self.y_min = x_max, x_min, y_max, y_min
+        self.x = self.clamp(x, x_min, x_max - size)
+        self.y = self.clamp(y, y_min, y_max - size)
+
+    def move(self, del_x, del_y):
+        self.x = self.clamp(self.x + del_x, self.x_min, self.x_max - self.size)
+        self.y = self.clamp(self.y + del_y, self.y_min, self.y_max - self.size)
+
+    @staticmethod
+    def clamp(n, minn, maxn):
+        return max(min(maxn, n), minn)
+
+
+class ReferenceChopperScape:
+    """
+    the ChopperScape engine before the entities were kept in arrays: a Bird or Fuel object per entity, moved and
+    collision-tested one at a time, and the canvas redrawn from a blank one every step; without the artefacts of
+    removing entities from the list being iterated over
+    """
+
+    def __init__(self, bird_spawn_prob, fuel_spawn_prob):
+        self.bird_spawn_prob = bird_spawn_prob
+        self.fuel_spawn_prob = fuel_spawn_prob
+        self.max_fuel = 1000
+        self.y_min, self.x_min, self.y_max, self.x_max = 60, 0, 540, 800
+
+    def entity(self, file_name, size, x, y):
+        return ReferenceEntity(file_name, size, x, y, self.x_max, self.x_min, self.y_max, self.y_min)
+
+    def reset(self):
+        self.fuel_left = self.max_fuel
+        self.ep_return = 0
+        self.chopper = self.entity("chopper.png", chopper_size, random.randrange(30, 60), random.randrange(120, 160))
+        self.chopper_alive = True
+        self.elements = []
+        return self.draw()
+
+    @staticmethod
+    def has_collided(elem1, elem2):
+        return 2 * abs(elem1.x - elem2.x) <= elem1.size + elem2.size and \
+            2 * abs(elem1.y - elem2.y) <= elem1.size + elem2.size
+
+    def step(self, action):
+        done = False
+        self.fuel_left -= 1
+        reward = 1
+        self.chopper.move(*[(0, 5), (0, -5), (5, 0), (-5, 0), (0, 0), (0, 0)][action])
+        if random.random() < self.bird_spawn_prob:
+            self.elements.append(self.entity("bird.png", 32, self.x_max, random.randrange(self.y_min, self.y_max)))
+        if random.random() < self.fuel_spawn_prob:
+            self.elements.append(self.entity("fuel.png", 32, random.randrange(self.x_min, self.x_max), self.y_max))
+        for elem in list(self.elements):
+            if elem.file_name == "bird.png":
+                if elem.x <= self.x_min:
+                    self.elements.remove(elem)
+                    continue
+                elem.move(-5, 0)
+                if self.chopper_alive and self.has_collided(self.chopper, elem):
+                    done = True
+                    reward = -10
+                    self.chopper_alive = False
+            else:
+                if elem.y <= self.y_min:
+                    self.elements.remove(elem)
+                    continue
+                elem.move(0, -5)
+                if self.has_collided(self.chopper, elem):
+                    self.elements.remove(elem)
+                    self.fuel_left = self.max_fuel
+        self.ep_return += 1
+        if self.fuel_left == 0:
+            done = True
+        return self.draw(), reward, done
+
+    def draw(self):
+        canvas = np.ones((600, 800, 3), dtype=np.float32)
+        for elem in ([self.chopper] if self.chopper_alive else []) + self.elements:
+            canvas[elem.y:elem.y + elem.size, elem.x:elem.x + elem.size] = load_sprite(elem.file_name, elem.size,
+                                                                                     elem.size)
+        text = 'Fuel Left: {} | Rewards: {}'.format(self.fuel_left, self.ep_return)
+        return cv2.putText(canvas, text, (10, 20), font, 0.8, (0, 0, 0), 1, cv2.LINE_AA)
+
+
+def game_state(env):
+    n = env.num_entities
+    return (env.chopper.x, env.chopper.y, env.chopper_alive, env.fuel_left, env.ep_return,
+            env.entity_x[:n].tolist(), env.entity_y[:n].tolist(), env.entity_type[:n].tolist())
+
+
+def reference_state(reference):
+    elements = reference.elements
+    return (reference.chopper.x, reference.chopper.y, reference.chopper_alive, reference.fuel_left,
+            reference.ep_return, [elem.x for elem in elements], [elem.y for elem in elements],
+            [0 if elem.file_name == "bird.png" else 1 for elem in elements])
+
+
+def full_redraw(env, size, mode):
+    """the frame of the current state of env drawn on a blank canvas"""
+    screen = SpriteCanvas(size, env.observation_shape[:2], mode)
+    screen.clear()
+    env.draw_elements_on_canvas(screen)
+    return screen.buffer
+
+
+def test_entity_arrays_match_reference_engine():
+    # crowded episodes, and sparse ones lasting long enough for the birds to cross the field
+    for seed, spawn_probs in [(seed, (0.1, 0.1)) for seed in range(3)] + [(seed, (0.02, 0.05)) for seed in (0, 2)]:
+        env = ChopperScape(*spawn_probs)
+        reference = ReferenceChopperScape(*spawn_probs)
+        lockstep = Lockstep(seed)
+        actions = np.random.RandomState(seed).randint(6, size=1000)
+        obs = lockstep.call(0, env.reset)
+        assert np.array_equal(obs, lockstep.call(1, reference.reset))
+        for action in actions.tolist():
+            obs, reward, done, info = lockstep.call(0, env.step, action)
+            reference_obs, reference_reward, reference_done = lockstep.call(1, reference.step, action)
+            assert game_state(env) == reference_state(reference)
+            assert (reward, done) == (reference_reward, reference_done)
+            assert np.array_equal(obs, reference_obs)
+            if done:
+                break
+
+
+def test_dirty_rect_canvases_match_full_redraw():
+    for obs_mode, size in (('canvas', (600, 800)), ('rgb', (84, 84)), ('gray', (84, 84)), ('gray', (120, 160))):
+        env = ChopperScape(0.2, 0.2, obs_mode=obs_mode, obs_size=size)
+        random.seed(0)
+        actions = np.random.RandomState(0).randint(6, size=600)
+        obs = env.reset()
+        assert np.array_equal(obs, full_redraw(env, size, obs_mode))
+        for action in actions.tolist():
+            obs, reward, done, info = env.step(action)
+            assert np.array_equal(obs, full_redraw(env, size, obs_mode))
+            if obs_mode != 'canvas':
+                # the canvas of render is kept up to date in the other modes too
+                assert np.array_equal(env.render(mode="rgb_array"), full_redraw(env, (600, 800), 'canvas'))
+            if done:
+                obs = env.reset()
+                assert np.array_equal(obs, full_redraw(env, size, obs_mode))
+
+
+def test_frame_skip_matches_repeated_steps():
+    for obs_mode in ('state', 'gray', 'canvas'):
+        for frame_skip, pool_frames in ((1, False), (4, False), (3, True)):
+            skipping = ChopperScape(0.1, 0.1, obs_mode=obs_mode, frame_skip=frame_skip, pool_frames=pool_frames)
+            env = ChopperScape(0.1, 0.1, obs_mode=obs_mode)
+            lockstep = Lockstep(1)
+            actions = np.random.RandomState(1).randint(6, size=200)
+            assert np.array_equal(lockstep.call(0, skipping.reset), lockstep.call(1, env.reset))
+            for action in actions.tolist():
+                skip_obs, skip_reward, skip_done, info = lockstep.call(0, skipping.step, action)
+                total_reward = 0
+                previous_obs = None
+                for a_frame in range(frame_skip):
+                    obs, reward, done, info = lockstep.call(1, env.step, action)
+                    total_reward += reward
+                    if a_frame == frame_skip - 2:
+                        previous_obs = obs.copy()
+                    if done:
+                        break
+                assert game_state(skipping) == game_state(env)
+                assert (skip_reward, skip_done) == (total_reward, done)
+                if pool_frames and obs_mode != 'state' and a_frame == frame_skip - 1:
+                    # pooled with the frame before the last one, unless the episode ended before it
+                    obs = np.minimum(obs, previous_obs)
+                assert np.array_equal(skip_obs, obs)
+                if done:
+                    break
@@ -0,0 +1,208 @@
+import numpy as np
+from gym import utils
+from gym.envs.toy_text import discrete
+from InsectGym.MultiPassengerTaxi.MultiPassengerTaxi import MultiPassengerTaxiEnv, MAP
+from InsectGym.MultiPassengerTaxi.MultiPassengerTaxiPick import MultiPassengerTaxiPickEnv
+from InsectGym.MultiPassengerTaxi.MultiPassengerTaxiMap import MultiPassengerTaxiMapEnv
+from InsectGym.MaggotInPetriDish.MaggotInPetriDish import MaggotInPetriDishEnv
+
+"""
+Regression tests of the array-backed tabular envs against the DiscreteEnv transition dictionaries, steps and
+renders of the envs they replaced. The reference_* functions are the loops of the original envs.
+"""
+
+locs = [(0, 2), (4, 6), (5, 0)]
+dest_loc = (0, 6)
+reward_options = (1, 3, 15)
+movements = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+taxi_actions = ["South", "North", "East", "West", "Pick/Drop"]
+
+
+def taxi_encode(row, col, pass_on):
+    return ((row * 7 + col) * 2 + pass_on[0]) * 2 * 2 + pass_on[1] * 2 + pass_on[2]
+
+
+def taxi_decode(s):
+    return s // 56, s // 8 % 7, [s // 4 % 2, s // 2 % 2, s % 2]
+
+
+def reference_taxi_P(pick_action):
+    """the transition dictionary of the original MultiPassengerTaxiEnv, or MultiPassengerTaxiPickEnv"""
+    desc = np.asarray(MAP, dtype="c")
+    num_actions = 5 if pick_action else 4
+    P = {state: {action: [] for action in range(num_actions)} for state in range(6 * 7 * 8)}
+    for state in range(6 * 7 * 8):
+        row, col, pass_on = taxi_decode(state)
+        for action in range(num_actions):
+            new_row, new_col, new_pass_on = row, col, list(pass_on)
+            reward = 0
+            done = False
+            if action <= 3:
+                new_row = max(min(row + movements[action][0], 5), 0)
+                new_col = max(min(col + movements[action][1], 6), 0)
+                if desc[1 + new_row, 2 * new_col + 1] == b"X":
+                    new_row, new_col = row, col
+            taxi_loc = (new_row, new_col)
+            for i in range(3):
+                if pick_action:
+                    if action == 4 and taxi_loc == locs[i]:
+                        new_pass_on[i] = 1 - pass_on[i]
+                elif pass_on[i] == 0 and taxi_loc == locs[i]:
+                    new_pass_on[i] = 1
+            if taxi_loc == dest_loc and sum(new_pass_on) > 0:
+                done = True
+                reward = reward_options[sum(new_pass_on) - 1]
+            P[state][action].append((1.0, taxi_encode(new_row, new_col, new_pass_on), reward, done))
+    return P
+
+
+def reference_taxi_render(env):
+    """the ansi render of the original taxi envs"""
+    out = [[c.decode("utf-8") for c in line] for line in np.asarray(MAP, dtype="c").tolist()]
+    taxi_row, taxi_col, pass_on = taxi_decode(env.s)
+    cell = out[1 + taxi_row][2 * taxi_col + 1]
+    if sum(pass_on):
+        out[1 + taxi_row][2 * taxi_col + 1] = utils.colorize("_" if cell == " " else cell, "green", highlight=True)
+    else:
+        out[1 + taxi_row][2 * taxi_col + 1] = utils.colorize(cell, "yellow", highlight=True)
+    for i in range(3):
+        if not pass_on[i]:
+            pi, pj = locs[i]
+            out[1 + pi][2 * pj + 1] = utils.colorize(out[1 + pi][2 * pj + 1], "blue", bold=True)
+    di, dj = dest_loc
+    out[1 + di][2 * dj + 1] = utils.colorize(out[1 + di][2 * dj + 1], "magenta")
+    text = "\n".join(["".join(row) for row in out]) + "\n"
+    if env.lastaction is not None:
+        return text + "  ({})\n".format(taxi_actions[env.lastaction])
+    return text + "\n"
+
+
+def reference_maggot_P(odor, reinforcer, never_done):
+    """the transition dictionary of the original MaggotInPetriDishEnv, with its 5 locations"""
+    reinforcer_reward = 1 if 'fructose' in reinforcer else -1 if 'quinine' in reinforcer else 0
+    P = {state: {action: [] for action in range(5)} for state in range(5)}
+    for location in range(5):
+        for action in range(5):
+            reward = 0
+            if odor[0] != odor[1]:
+                new_location = location
+                if 'AM' in odor:
+                    if action == 1 and location != 0:
+                        new_location = location - 1
+                    elif action == 2 and location != 4:
+                        new_location = location + 1
+                    if action == 1:
+                        reward = reinforcer_reward
+                if 'OCT' in odor:
+                    if action == 3 and location != 4:
+                        new_location = location + 1
+                    elif action == 4 and location != 0:
+                        new_location = location - 1
+                    if action == 3:
+                        reward = reinforcer_reward
+                outcomes = [(1.0, new_location)]
+            else:
+                if (action == 1 and 'AM' in odor) or (action == 3 and 'OCT' in odor):
+                    reward = reinforcer_reward
+                if action == 0:
+                    outcomes = [(1.0, location)]
+                elif location == 0:
+                    outcomes = [(0.5, 0), (0.5, 1)]
+                elif location == 4:
+                    outcomes = [(0.5, 3), (0.5, 4)]
+                else:
+                    outcomes = [(0.5, location - 1), (0.5, location + 1)]
+            done = reward == 1 and not never_done
+            for probability, new_location in outcomes:
+                P[location][action].append((probability, new_location, reward, done))
+    return P
+
+
+def reference_maggot_render(env):
+    """the ansi render of the original MaggotInPetriDishEnv"""
+    out = [[c.decode("utf-8") for c in line] for line in env.desc.tolist()]
+    out[2][env.layer_name_length + (env.s + 1) * 2] = utils.colorize('m', "yellow", highlight=True)
+    return "\n".join(["".join(row) for row in out]) + "\n"
+
+
+def assert_table_matches_P(table, P):
+    for state in range(table.nS):
+        for action in range(table.nA):
+            outcomes = P[state][action]
+            k = len(outcomes)
+            assert table.probs[state, action, :k].tolist() == [outcome[0] for outcome in outcomes]
+            assert table.next_states[state, action, :k].tolist() == [outcome[1] for outcome in outcomes]
+            assert table.rewards[state, action, :k].tolist() == [outcome[2] for outcome in outcomes]
+            assert table.dones[state, action, :k].tolist() == [outcome[3] for outcome in outcomes]
+            assert np.all(table.probs[state, action, k:] == 0)
+
+
+def assert_same_episodes(env, reference, render, seed=0, num_steps=2000):
+    """step env and the reference env with the same seeds and actions, comparing every step and render"""
+    env.seed(seed)
+    reference.seed(seed)
+    actions = np.random.RandomState(seed).randint(env.action_space.n, size=num_steps)
+    assert env.reset() == reference.reset()
+    for action in actions.tolist():
+        step = env.step(action)
+        reference_step = reference.step(action)
+        assert step[:3] == reference_step[:3]
+        assert step[3]["prob"] == reference_step[3]["prob"]
+        if render is not None:
+            assert env.render(mode="ansi") == render(reference)
+        if step[2]:
+            assert env.reset() == reference.reset()
+
+
+def reference_env(P, nA, start):
+    nS = len(P)
+    isd = np.zeros(nS)
+    isd[start] = 1
+    env = discrete.DiscreteEnv(nS, nA, P, isd)
+    env.lastaction = None
+    return env
+
+
+def test_taxi_tables_match_original_P():
+    assert_table_matches_P(MultiPassengerTaxiEnv().table, reference_taxi_P(False))
+    assert_table_matches_P(MultiPassengerTaxiPickEnv().table, reference_taxi_P(True))
+
+
+def test_maggot_tables_match_original_P():
+    for odor in (['AM', 'OCT'], ['AM', 'AM'], ['OCT', 'OCT'], [None, None]):
+        for reinforcer in (['fructose'], ['quinine'], [None]):
+            for never_done in (False, True):
+                env = MaggotInPetriDishEnv(odor, reinforcer, never_done=never_done)
+                assert_table_matches_P(env.table, reference_maggot_P(odor, reinforcer, never_done))
+
+
+def test_taxi_seeded_steps_and_renders_match_original():
+    for pick_action, env in ((False, MultiPassengerTaxiEnv()), (True, MultiPassengerTaxiPickEnv())):
+        reference = reference_env(reference_taxi_P(pick_action), env.nA, taxi_encode(0, 0, [0, 0, 0]))
+        assert_same_episodes(env, reference, reference_taxi_render)
+
+
+def test_maggot_seeded_steps_and_renders_match_original():
+    # same odors on both sides make the moves stochastic, so the sampling has to consume the random numbers alike
+    for odor in (['AM', 'OCT'], ['AM', 'AM']):
+        env = MaggotInPetriDishEnv(odor, ['fructose'])
+        reference = reference_env(reference_maggot_P(odor, ['fructose'], False), 5, 2)
+        reference.desc = env.desc
+        reference.layer_name_length = env.layer_name_length
+        assert_same_episodes(env, reference, reference_maggot_render)
+
+
+def test_taxi_map_defaults_match_taxi_envs():
+    for pick_action, taxi in ((False, MultiPassengerTaxiEnv()), (True, MultiPassengerTaxiPickEnv())):
+        env = MultiPassengerTaxiMapEnv(pick_action=pick_action)
+        table = env.transition_table()
+        for an_array, taxi_array in zip(table.arrays(), taxi.table.arrays()):
+            assert np.array_equal(an_array, taxi_array)
+        assert env.reset() == taxi.reset()
+        actions = np.random.RandomState(1).randint(env.nA, size=2000)
+        for action in actions.tolist():
+            step = env.step(action)
+            assert step[:3] == taxi.step(action)[:3]
+            assert env.render(mode="ansi") == taxi.render(mode="ansi")
+            if step[2]:
+                assert env.reset() == taxi.reset()
@@ -0,0 +1,95 @@
+import numpy as np
+import cv2
+from gym import utils
+
+"""
+Renderer for the character maps of the text envs (MultiPassengerTaxi, MaggotInPetriDish).
+
+The map is decoded once into a template. A frame is described by a list of patches
+    (row, col, char, color, highlight, bold)
+where char replaces the template character (None keeps it) and color, highlight and bold are passed to
+gym.utils.colorize. Patches on the same cell are applied in order, as nested colorize calls would be.
+Only the rows (text) or cells (rgb_array) patched in the previous or the current frame are redrawn.
+"""
+
+# RGB values of the gym.utils.colorize colors
+COLORS = {
+    "gray": (128, 128, 128),
+    "red": (205, 49, 49),
+    "green": (13, 188, 121),
+    "yellow": (229, 229, 16),
+    "blue": (36, 114, 200),
+    "magenta": (188, 63, 188),
+    "cyan": (17, 168, 205),
+    "white": (229, 229, 229),
+    "crimson": (220, 20, 60),
+}
+FOREGROUND = (204, 204, 204)
+BACKGROUND = (0, 0, 0)
+font = cv2.FONT_HERSHEY_PLAIN
+
+
+class TextGridRenderer:
+    def __init__(self, desc, glyph_size=(16, 10)):
+        self.template = [[c.decode("utf-8") for c in line] for line in np.asarray(desc).tolist()]
+        self.lines = ["".join(row) for row in self.template]
+        self.glyph_h, self.glyph_w = glyph_size
+        # glyph atlas: (char, foreground, background, bold) -> glyph tile
+        self.atlas = {}
+        self.frame = None
+        self.text_rows = set()
+        self.rgb_cells = set()
+
+    def render_text(self, patches):
+        """the map as a string, with the patched cells colorized"""
+        cells = {}
+        for row, col, char, color, highlight, bold in patches:
+            text = cells.get((row, col), self.template[row][col] if char is None else char)
+            cells[(row, col)] = utils.colorize(text, color, bold=bold, highlight=highlight)
+        rows = {row for row, col in cells}
+        for row in rows | self.text_rows:
+            line = self.template[row][:]
+            for (a_row, col), text in cells.items():
+                if a_row == row:
+                    line[col] = text
+            self.lines[row] = "".join(line)
+        self.text_rows = rows
+        return "\n".join(self.lines)
+
+    def render_rgb(self, patches):
+        """the map as an RGB image of glyphs, with the patched cells colored"""
+        if self.frame is None:
+            self.frame = np.zeros((len(self.template) * self.glyph_h, len(self.template[0]) * self.glyph_w, 3),
+                                  dtype=np.uint8)
+            for row, line in enumerate(self.template):
+                for col, char in enumerate(line):
+                    self.draw_cell(row, col, (char, FOREGROUND, BACKGROUND, False))
+        styles = {}
+        for row, col, char, color, highlight, bold in patches:
+            style = styles.get((row, col), (self.template[row][col] if char is None else char,
+                                            FOREGROUND, BACKGROUND, False))
+            if highlight:
+                style = (style[0], style[1], COLORS[color], style[3] or bold)
+            else:
+                style = (style[0], COLORS[color], style[2], style[3] or bold)
+            styles[(row, col)] = style
+        for row, col in self.rgb_cells - set(styles):
+            self.draw_cell(row, col, (self.template[row][col], FOREGROUND, BACKGROUND, False))
+        for (row, col), style in styles.items():
+            self.draw_cell(row, col, style)
+        self.rgb_cells = set(styles)
+        return self.frame.copy()
+
+    def draw_cell(self, row, col, style):
+        y = row * self.glyph_h
+        x = col * self.glyph_w
+        self.frame[y:y + self.glyph_h, x:x + self.glyph_w] = self.glyph(style)
+
+    def glyph(self, style):
+        if style not in self.atlas:
+            char, foreground, background, bold = style
+            tile = np.empty((self.glyph_h, self.glyph_w, 3), dtype=np.uint8)
+            tile[:] = background
+            cv2.putText(tile, char, (1, self.glyph_h - 4), font, 0.9, foreground, 2 if bold else 1, cv2.LINE_AA)
+            self.atlas[style] = tile
+        return self.atlas[style]
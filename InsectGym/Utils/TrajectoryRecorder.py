@@ -0,0 +1,170 @@
+import glob
+import json
+import os
+import numpy as np
+import gym
+
+
+def default_fields(env):
+    """the env-specific fields recorded after each step, as name -> function of the unwrapped env"""
+    if hasattr(env, 'robot'):
+        # VoronoiWorld and VoronoiWorldGoal
+        return {'fuel_left': lambda an_env: an_env.robot.fuel_left,
+                'goal': lambda an_env: an_env.goal_indexes}
+    if hasattr(env, 'entity_type'):
+        # ChopperScape
+        return {'fuel_left': lambda an_env: an_env.fuel_left}
+    return {}
+
+
+def flatten(name, value, values):
+    """add value to the dict values as name, or the items of a dict value (e.g. a goal observation) as name_key"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(name + '_' + key, item, values)
+    else:
+        values[name] = value
+
+
+def copy_observation(obs):
+    """a copy of obs, whose arrays can be views of buffers that the env overwrites (e.g. ChopperScape)"""
+    if isinstance(obs, dict):
+        return {key: copy_observation(value) for key, value in obs.items()}
+    return obs.copy() if isinstance(obs, np.ndarray) else obs
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """
+    Records every transition of env into preallocated arrays, one per field, and writes them to the directory path
+    each time chunk_size transitions have been recorded (and on flush or close), or fewer when chunk_size
+    transitions would take more than max_chunk_bytes, as for image observations.
+
+    The fields of a transition are episode, step, obs, action, reward, done, next_obs (unless next_obs is False) and
+    the env-specific fields, by default those of default_fields (e.g. the fuel left and the goal indexes of
+    VoronoiWorld); dict observations are recorded as one field per key. The arrays are allocated at the first
+    transition with the shapes and dtypes of its values, so recording a step only copies the values into them.
+
+    file_format is
+    - 'npz': every chunk is written to a compressed chunk_<number>.npz file
+    - 'memmap': every chunk is appended to a raw <field>.bin file per field, described by fields.json, which
+      load_trajectories opens as memory-mapped arrays
+    Recording into a directory that already has chunks carries on after them.
+    """
+
+    def __init__(self, env, path, chunk_size=10000, file_format='npz', fields=None, next_obs=True,
+                 max_chunk_bytes=2 ** 28):
+        super(TrajectoryRecorder, self).__init__(env)
+        assert file_format in ('npz', 'memmap'), "Invalid file_format, must be \"npz\" or \"memmap\""
+        self.path = path
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.file_format = file_format
+        self.fields = default_fields(env.unwrapped) if fields is None else fields
+        self.next_obs = next_obs
+        os.makedirs(path, exist_ok=True)
+        self.num_chunks = len(glob.glob(os.path.join(path, 'chunk_*.npz')))
+        self.buffers = None
+        self.size = 0
+        self.episode = -1
+        self.episode_step = 0
+        self.obs = None
+
+    def reset(self, **kwargs):
+        obs = self.env.reset(**kwargs)
+        self.obs = copy_observation(obs)
+        self.episode += 1
+        self.episode_step = 0
+        return obs
+
+    def step(self, action):
+        next_obs, reward, done, info = self.env.step(action)
+        values = {'episode': self.episode, 'step': self.episode_step}
+        flatten('obs', self.obs, values)
+        values['action'] = action
+        values['reward'] = reward
+        values['done'] = done
+        if self.next_obs:
+            flatten('next_obs', next_obs, values)
+        env = self.env.unwrapped
+        for name, get in self.fields.items():
+            values[name] = get(env)
+        self.record(values)
+        self.obs = copy_observation(next_obs)
+        self.episode_step += 1
+        return next_obs, reward, done, info
+
+    def record(self, values):
+        """copy the values of a transition into the buffers, writing them out when they are full"""
+        if self.buffers is None:
+            arrays = {name: np.asarray(value, dtype=np.float64 if name == 'reward' else None)
+                      for name, value in values.items()}
+            transition_bytes = sum(an_array.nbytes for an_array in arrays.values())
+            self.chunk_size = max(1, min(self.chunk_size, self.max_chunk_bytes // transition_bytes))
+            self.buffers = {name: np.zeros((self.chunk_size,) + an_array.shape, dtype=an_array.dtype)
+                            for name, an_array in arrays.items()}
+        for name, value in values.items():
+            self.buffers[name][self.size] = value
+        self.size += 1
+        if self.size == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """write the transitions recorded since the last flush"""
+        if self.size == 0:
+            return
+        chunk = {name: buffer[:self.size] for name, buffer in self.buffers.items()}
+        if self.file_format == 'npz':
+            np.savez_compressed(os.path.join(self.path, 'chunk_%06d.npz' % self.num_chunks), **chunk)
+        else:
+            append_columns(self.path, chunk)
+        self.num_chunks += 1
+        self.size = 0
+
+    def close(self):
+        self.flush()
+        return self.env.close()
+
+
+def append_columns(path, columns):
+    """
+    append columns, a dict of field -> array of the same length, to the raw <field>.bin files of the directory path
+    described by fields.json; the files are cut back to the length of fields.json first, so the rows of an append
+    that was interrupted are dropped rather than misaligned
+    """
+    meta_path = os.path.join(path, 'fields.json')
+    meta = {'length': 0, 'fields': {}}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    for name, array in columns.items():
+        meta['fields'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape[1:])}
+        row_bytes = array.dtype.itemsize * int(np.prod(array.shape[1:]))
+        with open(os.path.join(path, name + '.bin'), 'ab') as f:
+            f.truncate(meta['length'] * row_bytes)
+            f.write(np.ascontiguousarray(array).tobytes())
+    meta['length'] += len(next(iter(columns.values())))
+    # fields.json is replaced in one go, so an interrupted write leaves the previous one
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def load_trajectories(path):
+    """
+    the transitions recorded by a TrajectoryRecorder in the directory path, as a dict of field -> array; the arrays
+    of the 'memmap' format are memory-mapped, those of the 'npz' format are the chunks concatenated
+    """
+    meta_path = os.path.join(path, 'fields.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return {name: np.memmap(os.path.join(path, name + '.bin'), dtype=field['dtype'], mode='r',
+                                shape=(meta['length'],) + tuple(field['shape']))
+                for name, field in meta['fields'].items()}
+    chunks = []
+    for chunk_path in sorted(glob.glob(os.path.join(path, 'chunk_*.npz'))):
+        with np.load(chunk_path) as chunk:
+            chunks.append(dict(chunk))
+    if not chunks:
+        return {}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
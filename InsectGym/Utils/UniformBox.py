@@ -0,0 +1,30 @@
+import numpy as np
+from gym import spaces
+
+
+class UniformBox(spaces.Box):
+    """
+    A Box with the same bounds low and high for every dimension. The bounds are read-only broadcast views of two
+    scalars, so the space of an image observation costs no memory, and it is pickled as the scalars.
+    """
+
+    def __init__(self, low, high, shape, dtype=np.float32, seed=None):
+        spaces.Space.__init__(self, tuple(shape), np.dtype(dtype))
+        if seed is not None:
+            self.seed(seed)
+        self.low_value = np.asarray(low, dtype=self.dtype)
+        self.high_value = np.asarray(high, dtype=self.dtype)
+        self.low = np.broadcast_to(self.low_value, self.shape)
+        self.high = np.broadcast_to(self.high_value, self.shape)
+        self.bounded_below = np.broadcast_to(-np.inf < self.low_value, self.shape)
+        self.bounded_above = np.broadcast_to(np.inf > self.high_value, self.shape)
+
+    def batch(self, n):
+        """the space of n observations stacked on a first axis"""
+        return UniformBox(self.low_value, self.high_value, (n,) + self.shape, self.dtype)
+
+    def __reduce__(self):
+        return UniformBox, (self.low_value.item(), self.high_value.item(), self.shape, self.dtype)
+
+    def __repr__(self):
+        return "UniformBox({}, {}, {}, {})".format(self.low_value, self.high_value, self.shape, self.dtype)
@@ -1,3 +1,109 @@
+import importlib
+import json
+import os
+import numpy as np
+
+"""
+Schema-based serialization of the InsectGym envs, mazes and transition tables.
+
+A class takes part by defining to_schema(), returning a dict of the fields that define an instance, and the
+classmethod from_schema(fields), building an instance back from them. Fields can be JSON values, numpy arrays and
+other objects with a schema, which are serialized recursively and tagged with their class. Arrays are written
+inline in the JSON, or with save to a .npz sidecar next to the .json file, so only the defining state is stored and
+an object is rebuilt from it in milliseconds.
+"""
+
+# the packages whose classes can be rebuilt from JSON, so that loading a file cannot import any other module
+schema_packages = ('InsectGym.',)
+
+
+def to_data(obj, arrays=None):
+    """
+    the JSON data of obj, with the numpy arrays written inline, or moved to the dict arrays and referenced by their
+    key in it
+    """
+    if hasattr(obj, 'to_schema'):
+        data = {key: to_data(value, arrays) for key, value in obj.to_schema().items()}
+        data['__class__'] = type(obj).__module__ + ':' + type(obj).__name__
+        return data
+    if isinstance(obj, np.ndarray):
+        if arrays is None:
+            return {'__array__': obj.tolist(), 'dtype': obj.dtype.str, 'shape': list(obj.shape)}
+        key = 'array_%d' % len(arrays)
+        arrays[key] = obj
+        return {'__array__': key}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        return {str(key): to_data(value, arrays) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_data(value, arrays) for value in obj]
+    assert type(obj) in (str, float, int, bool, type(None)), "no schema to serialize a " + type(obj).__name__
+    return obj
+
+
+def schema_class(name):
+    """the class of a 'module:Class' tag written by to_data, which must have a schema and be in schema_packages"""
+    module_name, _, class_name = name.partition(':')
+    if not module_name.startswith(schema_packages):
+        raise ValueError("Cannot load " + repr(name) + ", only classes of the packages " +
+                         ", ".join(a_package.rstrip('.') for a_package in schema_packages) + " can be loaded")
+    cls = getattr(importlib.import_module(module_name), class_name, None)
+    if not hasattr(cls, 'from_schema'):
+        raise ValueError("Cannot load " + repr(name) + ", it is not a class with a schema")
+    return cls
+
+
+def from_data(data, arrays=None):
+    """the object of the JSON data made by to_data, arrays being the arrays referenced in it"""
+    if isinstance(data, dict):
+        if '__array__' in data:
+            if isinstance(data['__array__'], str):
+                return arrays[data['__array__']]
+            return np.array(data['__array__'], dtype=data['dtype']).reshape(data['shape'])
+        fields = {key: from_data(value, arrays) for key, value in data.items() if key != '__class__'}
+        if '__class__' not in data:
+            return fields
+        return schema_class(data['__class__']).from_schema(fields)
+    if isinstance(data, list):
+        return [from_data(value, arrays) for value in data]
+    return data
+
+
+def dumps(obj):
+    """compact JSON of obj, arrays included"""
+    return json.dumps(to_data(obj), separators=(',', ':'), sort_keys=True)
+
+
+def loads(text):
+    return from_data(json.loads(text))
+
+
+def sidecar_path(path):
+    """the .npz file holding the arrays of the .json file path"""
+    return os.path.splitext(path)[0] + '.npz'
+
+
+def save(obj, path, sidecar=True):
+    """write obj to the .json file path, with its arrays in the sidecar_path .npz file unless sidecar is False"""
+    arrays = {} if sidecar else None
+    data = to_data(obj, arrays)
+    with open(path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'), sort_keys=True)
+    if arrays:
+        np.savez(sidecar_path(path), **arrays)
+
+
+def load(path):
+    """the object saved to the .json file path"""
+    with open(path) as f:
+        data = json.load(f)
+    if not os.path.exists(sidecar_path(path)):
+        return from_data(data)
+    with np.load(sidecar_path(path)) as arrays:
+        return from_data(data, arrays)
+
+
 def sterilize(obj):
     """Make an object more ameniable to dumping as json
     """
@@ -25,4 +131,4 @@ def sterilize(obj):
     else:
         if len(dict_ret) == 0:
             return list_ret
-    return (list_ret, dict_ret)
\ No newline at end of file
+    return (list_ret, dict_ret)
@@ -0,0 +1,99 @@
+import numpy as np
+import cv2
+import gym
+import matplotlib.pyplot as plt
+from InsectGym.Voronoi.VoronoiRaster import get_raster
+
+"""
+Per-cell visitation heatmaps of Voronoi mazes.
+
+A VisitationCounter keeps one visit count per cell, updated with np.bincount from whole arrays of cell indexes
+(trajectories, batched observations) or from single observations, so its size does not grow with the number of
+steps. heatmap_image draws the counts through the label map of the maze (see VoronoiRaster) in one lookup.
+"""
+
+
+class VisitationCounter:
+    def __init__(self, num_cells):
+        self.counts = np.zeros(num_cells, dtype=np.int64)
+
+    @classmethod
+    def for_maze(cls, maze):
+        return cls(len(maze.voronoi.points))
+
+    def add(self, cells):
+        """
+        count the visits of a cell index, an array of them (any shape, e.g. a batch of observations or a recorded
+        trajectory) or the observations of a VoronoiWorldGoal, one or batched
+        """
+        if isinstance(cells, dict):
+            cells = cells['observation']
+        if np.ndim(cells) == 0:
+            self.counts[cells] += 1
+        else:
+            self.counts += np.bincount(np.ravel(cells), minlength=len(self.counts))
+
+    def merge(self, other):
+        """add the counts of another VisitationCounter (e.g. from another process) to these"""
+        self.counts += other.counts
+
+    def save(self, path):
+        np.save(path, self.counts)
+
+    @classmethod
+    def load(cls, path):
+        counter = cls(0)
+        counter.counts = np.load(path)
+        return counter
+
+
+class VisitationWrapper(gym.Wrapper):
+    """
+    counts the cells observed by a VoronoiWorld, a VoronoiWorldGoal or a vector env of either in counter. The
+    vector envs reset the copies that are done in the same step, so the last cells of their episodes are counted
+    from the 'terminal_observation' of their infos (see make_vec)
+    """
+
+    def __init__(self, env, counter=None):
+        super(VisitationWrapper, self).__init__(env)
+        self.is_vector_env = hasattr(env, 'single_observation_space')
+        space = env.single_observation_space if self.is_vector_env else env.observation_space
+        if isinstance(space, gym.spaces.Dict):
+            space = space['observation']
+        self.counter = VisitationCounter(space.n) if counter is None else counter
+
+    def reset(self, **kwargs):
+        obs = self.env.reset(**kwargs)
+        self.counter.add(obs)
+        return obs
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        self.counter.add(obs)
+        if self.is_vector_env:
+            for a_game in np.flatnonzero(done):
+                if 'terminal_observation' in info[a_game]:
+                    self.counter.add(info[a_game]['terminal_observation'])
+        return obs, reward, done, info
+
+
+def heatmap_colors(counts, colormap='viridis', log=True, unvisited_color=(255, 255, 255)):
+    """RGB color of each cell for its count, on a log(1 + count) scale with log, unvisited cells in unvisited_color"""
+    values = np.log1p(counts) if log else np.asarray(counts, dtype=float)
+    top = values.max()
+    fractions = values / top if top > 0 else values
+    colors = (plt.get_cmap(colormap)(fractions)[:, :3] * 255).astype(np.uint8)
+    colors[np.asarray(counts) == 0] = unvisited_color
+    return colors
+
+
+def heatmap_image(maze, counts, size=(500, 500), colormap='viridis', log=True, unvisited_color=(255, 255, 255),
+                  wall_color=(0, 0, 0)):
+    """RGB image of maze with each cell colored by its visit count (see heatmap_colors)"""
+    raster = get_raster(maze, size)
+    return raster.colorize(heatmap_colors(counts, colormap, log, unvisited_color), unvisited_color, wall_color)
+
+
+def save_heatmap(path, maze, counts, **kwargs):
+    """write the heatmap_image of counts to an image file"""
+    cv2.imwrite(path, cv2.cvtColor(heatmap_image(maze, counts, **kwargs), cv2.COLOR_RGB2BGR))
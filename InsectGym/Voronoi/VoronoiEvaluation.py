@@ -0,0 +1,176 @@
+import os
+import random
+from multiprocessing import Pool
+import numpy as np
+from InsectGym.Utils import io
+from InsectGym.Utils.TrajectoryRecorder import append_columns, load_trajectories
+from InsectGym.Voronoi.VoronoiWorld import VoronoiWorld, make_maze
+from InsectGym.Tabular.solvers import solve
+
+"""
+Parallel evaluation of a policy on VoronoiWorld over many mazes and seeds.
+
+evaluate() runs (maze, seed) jobs over a pool of processes. Each worker builds the maze and its headless env (the
+maze is only plotted when rendered) once and reuses them for all the jobs of that maze, which are handed out
+together. The metrics of every episode are appended, as the jobs finish, to a columnar results directory in the
+'memmap' format of TrajectoryRecorder (see load_results), and an evaluation that was interrupted carries on from
+the (maze, seed) jobs that are not in it yet.
+
+Mazes are either maze ids, the maze of id i being generated from the seed i (see seeded_maze), so a worker makes
+it without it being sent, or mazes given as objects or as files saved with Utils.io, whose id is their position.
+"""
+
+result_fields = ('maze', 'seed', 'episode', 'return', 'steps', 'fuel_used', 'shortest_path', 'optimality_gap',
+                 'solved')
+
+# (maze id, num_exits, multi_route_prob) or maze JSON -> env and its shortest_path_lengths, in each worker process
+env_cache = {}
+
+# env -> its optimal policy, in each process
+optimal_policies = {}
+
+
+def random_policy(obs, env):
+    return env.action_space.sample()
+
+
+def optimal_policy(obs, env):
+    """the shortest path policy, from the value iteration of the maze, solved at the first step of each env"""
+    if env not in optimal_policies:
+        optimal_policies[env] = solve(env).policy
+    return int(optimal_policies[env][obs])
+
+
+def seeded_maze(maze_id, num_exits=1, multi_route_prob=0.1):
+    """the maze of id maze_id, the same in every process, leaving the random generators as they were"""
+    states = random.getstate(), np.random.get_state()
+    random.seed(maze_id)
+    np.random.seed(maze_id)
+    try:
+        return make_maze(num_exits, multi_route_prob)
+    finally:
+        random.setstate(states[0])
+        np.random.set_state(states[1])
+
+
+def shortest_path_lengths(env):
+    """the least number of steps from each cell to a goal of env, -1 for the cells that cannot reach one"""
+    next_states = env.transition_table().next_states[..., 0]
+    lengths = np.full(env.number_of_locations, -1)
+    lengths[env.goal_indexes] = 0
+    length = 0
+    while True:
+        reached = (lengths < 0) & np.any(lengths[next_states] == length, axis=1)
+        if not reached.any():
+            return lengths
+        length += 1
+        lengths[reached] = length
+
+
+def get_env(maze, num_exits, multi_route_prob):
+    """the (cached) env of a maze id or maze JSON, and its shortest_path_lengths"""
+    key = maze if isinstance(maze, str) else (maze, num_exits, multi_route_prob)
+    if key not in env_cache:
+        if isinstance(maze, str):
+            maze = io.loads(maze)
+        else:
+            maze = seeded_maze(maze, num_exits, multi_route_prob)
+        env = VoronoiWorld(num_exits=num_exits, maze=maze)
+        env_cache[key] = env, shortest_path_lengths(env)
+    return env_cache[key]
+
+
+def run_episode(env, policy, max_steps):
+    obs = env.reset()
+    start = obs
+    total_reward = 0
+    steps = 0
+    done = False
+    while not done and steps < max_steps:
+        obs, reward, done, info = env.step(policy(obs, env))
+        total_reward += reward
+        steps += 1
+    return start, total_reward, steps, bool(env.is_goal(obs))
+
+
+def run_job(job):
+    """the result rows, as a dict of field -> list, of the episodes of a (maze, seed) job"""
+    maze_id, maze, seed, policy, episodes, max_steps, num_exits, multi_route_prob = job
+    env, shortest_paths = get_env(maze, num_exits, multi_route_prob)
+    random.seed(seed)
+    np.random.seed(seed)
+    env.seed(seed)
+    env.action_space.seed(seed)
+    rows = {name: [] for name in result_fields}
+    for episode in range(episodes):
+        start, total_reward, steps, solved = run_episode(env, policy, max_steps)
+        shortest_path = shortest_paths[start]
+        for name, value in zip(result_fields, (maze_id, seed, episode, total_reward, steps,
+                                               env.robot.max_fuel - env.robot.fuel_left, shortest_path,
+                                               steps - shortest_path, solved)):
+            rows[name].append(value)
+    return rows
+
+
+def load_results(path):
+    """the results of evaluate in the directory path, as a dict of field -> memory-mapped array"""
+    return load_trajectories(path)
+
+
+def write_rows(path, rows):
+    columns = {name: np.concatenate([a_row[name] for a_row in rows]) for name in result_fields}
+    columns['return'] = columns['return'].astype(np.float64)
+    columns['solved'] = columns['solved'].astype(bool)
+    append_columns(path, columns)
+
+
+def evaluate(path, mazes=10, seeds=10, policy=random_policy, episodes=1, max_steps=10000, num_exits=1,
+             multi_route_prob=0.1, processes=None, flush_every=100):
+    """
+    evaluate policy, a function (obs, env) -> action that can be pickled (e.g. defined at the top level of a
+    module), with the episodes of every (maze, seed) job, and append their metrics to the results directory path:
+        -return, steps and fuel used by the episode
+        -the length of the shortest path from its start to a goal, and the optimality gap, the number of steps more
+         than that
+        -whether it ended on a goal, rather than out of fuel or after max_steps
+    mazes is a number of maze ids, a list of maze ids or a list of mazes, envs or files saved with Utils.io; seeds is
+    a number of seeds or a list of them. The jobs already in path are skipped. Results are written every
+    flush_every jobs; processes=0 runs the jobs in the calling process. Returns the results (see load_results).
+    """
+    if isinstance(mazes, int):
+        mazes = range(mazes)
+    if isinstance(seeds, int):
+        seeds = range(seeds)
+    os.makedirs(path, exist_ok=True)
+    done_jobs = set()
+    results = load_results(path)
+    if results:
+        done_jobs = set(zip(results['maze'].tolist(), results['seed'].tolist()))
+    jobs = []
+    for maze_id, maze in enumerate(mazes):
+        if isinstance(maze, (int, np.integer)):
+            maze_id = int(maze)
+        else:
+            maze = io.dumps(getattr(io.load(maze) if isinstance(maze, str) else maze, 'maze', maze))
+        for seed in seeds:
+            if (maze_id, seed) not in done_jobs:
+                jobs.append((maze_id, maze, seed, policy, episodes, max_steps, num_exits, multi_route_prob))
+    rows = []
+    if processes == 0:
+        finished = map(run_job, jobs)
+    else:
+        pool = Pool(processes)
+        # the jobs of a maze go to the same worker, which builds the maze once
+        finished = pool.imap_unordered(run_job, jobs, chunksize=max(1, len(seeds)))
+    try:
+        for a_row in finished:
+            rows.append(a_row)
+            if len(rows) == flush_every:
+                write_rows(path, rows)
+                rows = []
+    finally:
+        if rows:
+            write_rows(path, rows)
+        if processes != 0:
+            pool.terminate()
+    return load_results(path)
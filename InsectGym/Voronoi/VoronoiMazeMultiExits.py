@@ -3,10 +3,21 @@ from InsectGym.Voronoi.voronoi_maze import VoronoiMaze
 import numpy as np
 
 class VoronoiMazeMultiExits(VoronoiMaze):
-    def __init__(self, width=100, height=100, multi_route_prob=0, num_exits=2):
-        super(VoronoiMazeMultiExits, self).__init__(width, height, multi_route_prob)
+    def __init__(self, width=100, height=100, multi_route_prob=0, num_exits=2, voronoi=None, paths=None):
+        super(VoronoiMazeMultiExits, self).__init__(width, height, multi_route_prob, voronoi, paths)
         self.start, self.exit = self.get_enter_exit_locations(num_exits)
 
+    def to_schema(self):
+        fields = super(VoronoiMazeMultiExits, self).to_schema()
+        fields['num_exits'] = len(self.exit)
+        return fields
+
+    @classmethod
+    def from_schema(cls, fields):
+        voronoi = fields['voronoi']
+        return cls(voronoi.width, voronoi.height, num_exits=fields['num_exits'], voronoi=voronoi,
+                   paths=fields['paths'])
+
     def get_enter_exit_locations(self, num_exits=1):
         """get enter and exit locations from edge points"""
         # just using first and last point for now because random points were often too close
@@ -0,0 +1,119 @@
+import hashlib
+import math
+import numpy as np
+import cv2
+
+"""
+Rasters of the cells of a Voronoi maze, to draw mazes, trajectories and heatmaps as images without matplotlib.
+
+A VoronoiRaster holds a label map of the maze, the index of the cell covering each pixel, with -1 on the walls
+and outside the cells, and the pixels of each cell grouped by cell, so drawing a cell only touches its own pixels
+and drawing a value per cell is a single lookup over the label map. Rasters are cached per maze and size by
+get_raster.
+"""
+
+# (maze key, height, width) -> VoronoiRaster
+raster_cache = {}
+
+
+def cell_polygon(voronoi, point):
+    """corners of the (convex) cell of point, in the order of their angles around the cell"""
+    corners = []
+    for wall in voronoi.cell_walls[point]:
+        for corner in wall:
+            if corner not in corners:
+                corners.append(corner)
+    cx = sum(corner[0] for corner in corners) / len(corners)
+    cy = sum(corner[1] for corner in corners) / len(corners)
+    corners.sort(key=lambda corner: math.atan2(corner[1] - cy, corner[0] - cx))
+    return np.array(corners, dtype=float)
+
+
+def maze_walls(maze):
+    """the edges of the diagram that are walls of the maze, i.e. not removed to open a passage"""
+    removed = set(maze.edges_to_remove)
+    return [edge for edge in maze.voronoi.updated_voronoi_edges
+            if edge not in removed and (edge[1], edge[0]) not in removed]
+
+
+def maze_key(maze):
+    """a key of the seed points and passages of maze, the same in every process"""
+    digest = hashlib.sha1(np.array(maze.voronoi.points).tobytes())
+    digest.update(maze.to_schema()['paths'].tobytes())
+    return digest.hexdigest()
+
+
+def get_raster(maze, size=(500, 500)):
+    """the (cached) VoronoiRaster of maze, size being (height, width)"""
+    key = (maze_key(maze),) + tuple(size)
+    if key not in raster_cache:
+        raster_cache[key] = VoronoiRaster(maze, size)
+    return raster_cache[key]
+
+
+class VoronoiRaster:
+    def __init__(self, maze, size=(500, 500), wall_thickness=1):
+        self.height, self.width = size
+        self.scale = np.array([self.width / maze.voronoi.width, self.height / maze.voronoi.height])
+        points = maze.voronoi.points
+        self.num_cells = len(points)
+        self.cell_indexes = {point: index for index, point in enumerate(points)}
+        # cv2 draws with 4 bits of sub-pixel precision
+        self.labels = np.full((self.height, self.width), -1, dtype=np.int32)
+        for index, point in enumerate(points):
+            cv2.fillConvexPoly(self.labels, self.to_pixels(cell_polygon(maze.voronoi, point), 16), index,
+                               lineType=cv2.LINE_8, shift=4)
+        self.walls = np.zeros((self.height, self.width), dtype=np.uint8)
+        for edge in maze_walls(maze):
+            first, second = self.to_pixels(np.array(edge, dtype=float), 16)
+            cv2.line(self.walls, tuple(first.tolist()), tuple(second.tolist()), 1, wall_thickness, cv2.LINE_8,
+                     shift=4)
+        self.walls = self.walls.astype(bool)
+        self.labels[self.walls] = -1
+        # pixels of cell c: self.pixels[self.offsets[c]:self.offsets[c + 1]], as flat indexes
+        flat_labels = self.labels.ravel()
+        self.pixels = np.argsort(flat_labels, kind='stable')[np.sum(flat_labels < 0):]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(flat_labels[flat_labels >= 0],
+                                                                  minlength=self.num_cells))])
+
+    def to_pixels(self, coordinates, factor=1):
+        """pixel (column, row) of maze coordinates, y pointing up, times factor and rounded"""
+        coordinates = np.asarray(coordinates, dtype=float)
+        columns = coordinates[..., 0] * self.scale[0]
+        rows = self.height - coordinates[..., 1] * self.scale[1]
+        return np.round(np.stack([columns, rows], axis=-1) * factor).astype(np.int32)
+
+    def cell_index(self, point):
+        return self.cell_indexes[tuple(point)]
+
+    def cell_pixels(self, cells):
+        """flat indexes of the pixels of a cell, or of an array of cells"""
+        cells = np.atleast_1d(cells)
+        if len(cells) == 1:
+            return self.pixels[self.offsets[cells[0]]:self.offsets[cells[0] + 1]]
+        return np.concatenate([self.pixels[self.offsets[a_cell]:self.offsets[a_cell + 1]] for a_cell in cells])
+
+    def background(self, color=(255, 255, 255), wall_color=(0, 0, 128)):
+        """RGB image of the maze walls"""
+        image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        image[:] = color
+        image[self.walls] = wall_color
+        return image
+
+    def paint(self, image, cells, color, alpha=1.0):
+        """paint cells of an RGB image in place with color, blended with the image by alpha"""
+        pixels = image.reshape(-1, image.shape[-1])
+        indexes = self.cell_pixels(cells)
+        if alpha == 1:
+            pixels[indexes] = color
+        else:
+            pixels[indexes] = (1 - alpha) * pixels[indexes] + alpha * np.asarray(color, dtype=float)
+        return image
+
+    def colorize(self, cell_colors, outside_color=(255, 255, 255), wall_color=(0, 0, 128)):
+        """RGB image with an RGB color per cell, cell_colors being of shape (num_cells, 3), drawn in one lookup"""
+        palette = np.concatenate([np.array([outside_color], dtype=np.uint8),
+                                  np.asarray(cell_colors, dtype=np.uint8)])
+        image = palette[self.labels + 1]
+        image[self.walls] = wall_color
+        return image
@@ -0,0 +1,134 @@
+import os
+from multiprocessing import Pool
+import numpy as np
+import cv2
+from InsectGym.Utils import io
+from InsectGym.Voronoi.VoronoiRaster import get_raster
+
+"""
+Offline replay of Voronoi maze trajectories, e.g. those recorded by a TrajectoryRecorder, without the env.
+
+Frames are drawn from the VoronoiRaster of the stored maze: the walls once, then for each step only the cells that
+change, and exported as a video or as a strip of frames. replay_many renders many trajectories across worker
+processes, sending each maze to the workers as its compact JSON (see Utils.io).
+"""
+
+video_extensions = ('.mp4', '.avi')
+
+# maze JSON -> maze, in each worker process
+maze_cache = {}
+
+
+def load_maze(maze):
+    """the maze of a maze, of an env or of the JSON file of either saved with Utils.io"""
+    if isinstance(maze, str):
+        maze = io.load(maze)
+    return getattr(maze, 'maze', maze)
+
+
+def start_and_exits(raster, maze):
+    """the cell indexes of the entrance and the exits of maze"""
+    exits = maze.exit if isinstance(maze.exit, list) else [maze.exit]
+    return raster.cell_index(maze.start), [raster.cell_index(an_exit) for an_exit in exits]
+
+
+def episode_cells(trajectories, episode):
+    """
+    the cells visited in an episode of the trajectories of a VoronoiWorld (see load_trajectories), including the
+    last one, and its goal cells
+    """
+    name = 'obs' if 'obs' in trajectories else 'obs_observation'
+    steps = np.flatnonzero(trajectories['episode'] == episode)
+    cells = np.append(trajectories[name][steps], trajectories['next_' + name][steps[-1]])
+    goals = np.atleast_1d(trajectories['goal'][steps[0]]) if 'goal' in trajectories else None
+    return cells, goals
+
+
+def replay_frames(maze, cells, size=(500, 500), start=None, goals=None, trail=True, text=True,
+                  colors_dict=None):
+    """
+    RGB frames of the robot moving through the cells of maze, one per cell index of cells, with the start cell
+    (the entrance by default) in blue, the goal cells (the exits by default) in green and, with trail, the cells
+    already visited in a lighter shade
+    """
+    colors = {'background_color': (255, 255, 255), 'maze_line_color': (0, 0, 128), 'start_color': (0, 0, 255),
+              'exit_color': (0, 128, 0), 'trail_color': (255, 200, 0), 'location_color': (0, 0, 255)}
+    colors.update(colors_dict or {})
+    raster = get_raster(maze, size)
+    entrance, exits = start_and_exits(raster, maze)
+    start = entrance if start is None else start
+    goals = exits if goals is None else goals
+    base = raster.background(colors['background_color'], colors['maze_line_color'])
+    raster.paint(base, start, colors['start_color'], 0.4)
+    raster.paint(base, goals, colors['exit_color'], 0.4)
+    for a_step, a_cell in enumerate(np.asarray(cells).tolist()):
+        frame = base.copy()
+        raster.paint(frame, a_cell, colors['location_color'], 0.6)
+        if text:
+            cv2.putText(frame, 'step: {}'.format(a_step), (10, 20), cv2.FONT_HERSHEY_COMPLEX_SMALL, 0.8, (0, 0, 0), 1,
+                        cv2.LINE_AA)
+        yield frame
+        if trail:
+            raster.paint(base, a_cell, colors['trail_color'], 0.3)
+
+
+def write_video(path, frames, fps=15):
+    """write RGB frames to a video file"""
+    writer = None
+    for frame in frames:
+        if writer is None:
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (frame.shape[1], frame.shape[0]))
+        writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    if writer is not None:
+        writer.release()
+
+
+def image_strip(frames, every=1, columns=10):
+    """one RGB image of every every-th frame, in rows of columns frames"""
+    frames = [frame for index, frame in enumerate(frames) if index % every == 0]
+    rows = []
+    for first in range(0, len(frames), columns):
+        row = frames[first:first + columns]
+        if first > 0:
+            # the last row is padded to the width of the others
+            row = row + [np.full_like(frames[0], 255)] * (columns - len(row))
+        rows.append(np.concatenate(row, axis=1))
+    return np.concatenate(rows, axis=0)
+
+
+def replay(maze, cells, path, fps=15, every=1, columns=10, **kwargs):
+    """
+    render the trajectory cells through maze (see load_maze) to path, a video for the video_extensions and an
+    image strip otherwise; kwargs are those of replay_frames
+    """
+    frames = replay_frames(load_maze(maze), cells, **kwargs)
+    if os.path.splitext(path)[1] in video_extensions:
+        write_video(path, frames, fps)
+    else:
+        cv2.imwrite(path, cv2.cvtColor(image_strip(frames, every, columns), cv2.COLOR_RGB2BGR))
+    return path
+
+
+def replay_job(job):
+    maze_json, cells, path, kwargs = job
+    if maze_json not in maze_cache:
+        maze_cache[maze_json] = io.loads(maze_json)
+    return replay(maze_cache[maze_json], cells, path, **kwargs)
+
+
+def replay_many(jobs, processes=None):
+    """
+    render (maze, cells, path) or (maze, cells, path, kwargs) jobs, as replay does, over a pool of processes;
+    returns the paths written
+    """
+    maze_jsons = {}
+    pool_jobs = []
+    for job in jobs:
+        maze, cells, path = job[:3]
+        kwargs = job[3] if len(job) > 3 else {}
+        maze = load_maze(maze)
+        if id(maze) not in maze_jsons:
+            maze_jsons[id(maze)] = (io.dumps(maze), maze)
+        pool_jobs.append((maze_jsons[id(maze)][0], np.asarray(cells), path, kwargs))
+    with Pool(processes) as pool:
+        return pool.map(replay_job, pool_jobs)
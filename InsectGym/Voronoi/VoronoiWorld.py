@@ -9,8 +9,8 @@ from InsectGym.Voronoi.voronoi_maze import VoronoiMaze
 from InsectGym.Voronoi.voronoi_maze_plots import VoronoiMazePlot
 from InsectGym.Voronoi.VoronoiMazeMultiExits import VoronoiMazeMultiExits
 from InsectGym.Voronoi.VoronoiMazeMultiExitsPlots import VoronoiMazeMultiExitsPlots
-import json
-from InsectGym.Utils.io import sterilize
+from InsectGym.Utils import io
+from InsectGym.Tabular.TabularEnv import TransitionTable
 import pickle
 
 font = cv2.FONT_HERSHEY_COMPLEX_SMALL
@@ -27,6 +27,13 @@ def fig_to_RGB_array(fig):
     return np.array(mp_canvas.renderer.buffer_rgba())
 
 
+def make_maze(num_exits=1, multi_route_prob=0.1, width=100, height=100):
+    """a random maze for VoronoiWorld, which can be shared by several envs"""
+    if num_exits == 1:
+        return VoronoiMaze(width=width, height=height, multi_route_prob=multi_route_prob)
+    return VoronoiMazeMultiExits(width=width, height=height, multi_route_prob=multi_route_prob, num_exits=num_exits)
+
+
 class Robot:
     def __init__(self, location, location_index=0):
         self.location = location
@@ -45,18 +52,27 @@ class Robot:
 
 
 class VoronoiWorld(Env):
-    def __init__(self, colors_dict=None, multi_route_prob=0.1, plot_path=None, task_path=None, num_exits=1):
+    def __init__(self, colors_dict=None, multi_route_prob=0.1, plot_path=None, task_path=None, num_exits=1,
+                 maze=None):
         super(VoronoiWorld, self).__init__()
         self.width = 100
         self.height = 100
         self.num_exits = num_exits
-        if self.num_exits == 1:
-            self.maze = VoronoiMaze(width=self.width, height=self.height, multi_route_prob=multi_route_prob)
-        else:
-            self.maze = VoronoiMazeMultiExits(width=self.width, height=self.height, multi_route_prob=multi_route_prob,
-                                              num_exits=self.num_exits)
+        # a maze given (see make_maze) is used as it is, and can be shared with other envs
+        if maze is None:
+            maze = make_maze(num_exits, multi_route_prob, self.width, self.height)
+        self.maze = maze
         self.locations = np.array(self.maze.voronoi.points)  # not self.maze.voronoi.vor.point because of 4 boundary points?
         self.number_of_locations = len(self.locations)
+        # coordinate -> index lookup of the cell seed points
+        self.location_indexes = {tuple(location): index for index, location in enumerate(self.maze.voronoi.points)}
+        # goals are kept as a per-maze boolean mask plus the index array of the cells marked in it
+        self.goal_mask = np.zeros(self.number_of_locations, dtype=bool)
+        self.goal_indexes = np.zeros(0, dtype=np.intp)
+        if self.num_exits == 1:
+            self.exit_indexes = np.array([self.coordinate_to_index(self.maze.exit)], dtype=np.intp)
+        else:
+            self.exit_indexes = np.array(self.coordinates_to_indexs(self.maze.exit), dtype=np.intp)
         print("max_viable_neighbours = %d" % self.maze.max_viable_neighbours)
         if not colors_dict:
             self.colors_dict = {
@@ -89,7 +105,12 @@ class VoronoiWorld(Env):
         #     self.maze_plot = VoronoiMazePlot(self.maze, colors_dict=self.colors_dict, )
         #     self.maze_plot.draw_voronoi(plot_path=plot_path, save=True)
         #     self.maze_plot.draw_maze(plot_path=plot_path, save=True, label_index=True)
-        self.init_plot_on_canvas(plot_path)
+        # the maze is plotted when the env is first rendered, or right away to save the plots to plot_path
+        self.maze_plot = None
+        if plot_path is not None:
+            self.init_plot_on_canvas(plot_path)
+        # whether a window was shown by render, headless builds of cv2 cannot destroy windows
+        self.window = False
         self.reset()
 
         if task_path is not None:
@@ -140,25 +161,31 @@ class VoronoiWorld(Env):
     def reset(self):
         self.start_location_index = self.coordinate_to_index(self.maze.start)
         self.robot = Robot(location=self.maze.start, location_index=self.start_location_index)
+        self.set_goals(self.exit_indexes)
         if self.num_exits == 1:
-            self.goal_location_index = self.coordinate_to_index(self.maze.exit)
+            self.goal_location_index = self.exit_indexes[0]
         else:
-            self.goal_location_index = self.coordinates_to_indexs(self.maze.exit)
+            self.goal_location_index = self.exit_indexes.tolist()
 
         self.goal_location = self.maze.exit
         self.reward = 0
         self.location_index = self.coordinate_to_index(self.robot.location)
         # Draw elements on the canvas
-        self.init_enter_exit_on_canvas()
-        self.draw_location_on_canvas()
+        if self.maze_plot is not None:
+            self.init_enter_exit_on_canvas()
+            self.draw_location_on_canvas()
         # return the observation
         return self.location_index
 
     def render(self, mode="human"):
         assert mode in ["human", "rgb_array"], "Invalid mode, must be either \"human\" or \"rgb_array\""
         # Draw elements on the canvas
+        if self.maze_plot is None:
+            self.init_plot_on_canvas()
+            self.init_enter_exit_on_canvas()
         self.draw_location_on_canvas()
         if mode == "human":
+            self.window = True
             cv2.imshow("Game", self.canvas)
             cv2.waitKey(10)
         elif mode == "rgb_array":
@@ -167,7 +194,8 @@ class VoronoiWorld(Env):
             super(VoronoiWorld, self).render(mode=mode)  # just raise an exception
 
     def close(self):
-        cv2.destroyAllWindows()
+        if self.window:
+            cv2.destroyAllWindows()
 
     def step(self, action):
         # Flag that marks the termination of an episode
@@ -190,19 +218,38 @@ class VoronoiWorld(Env):
         # If out of fuel, end the episode.
         if self.robot.fuel_left == 0:
             done = True
-        if np.any(self.robot.location_index == self.goal_location_index):
+        if self.goal_mask[self.robot.location_index]:
             self.reward += 20
             done = True
         state = {'robot_location': self.robot.location, 'goal_location': self.goal_location}
         return self.robot.location_index, self.reward, done, state
 
+    def set_goals(self, goal_indexes):
+        """mark the goal cells in the goal mask, only clearing the cells marked by the previous goals"""
+        self.goal_mask[self.goal_indexes] = False
+        self.goal_indexes = np.atleast_1d(np.asarray(goal_indexes, dtype=np.intp))
+        self.goal_mask[self.goal_indexes] = True
+
+    def is_goal(self, location_index):
+        """check a location index, or an array of them, against the current goals"""
+        return self.goal_mask[location_index]
+
+    def transition_table(self):
+        """the maze as a deterministic MDP over the cells, for the current goals, compiled into a TransitionTable"""
+        num_actions = self.action_space.n
+        next_states = np.repeat(np.arange(self.number_of_locations)[:, None], num_actions, axis=1)
+        for index, location in enumerate(self.maze.voronoi.points):
+            for action, neighbour in enumerate(self.maze.path_graph.get(location, [])):
+                next_states[index, action] = self.location_indexes[neighbour]
+        dones = self.goal_mask[next_states]
+        rewards = np.where(dones, -1 + 20, -1)
+        return TransitionTable(np.ones(next_states.shape + (1,)), next_states[..., None], rewards[..., None],
+                               dones[..., None])
+
     def coordinate_to_index(self, coordinate):
         # self.maze.voronoi.points
         # self.maze.voronoi.vor.point
-        first_indexes = np.where(self.locations[:, 0] == coordinate[0])
-        for first_index in first_indexes:
-            if self.locations[first_index, 1] == coordinate[1]:
-                return first_index[0]
+        return self.location_indexes.get(tuple(coordinate))
 
     def coordinates_to_indexs(self, locations):
         # self.maze.voronoi.points
@@ -221,16 +268,44 @@ class VoronoiWorld(Env):
                 point_list.append(self.maze.voronoi.points[an_index])
             return point_list
 
+    def to_schema(self):
+        """the defining state of the env: its maze and options, and where its episode is"""
+        return {'maze': self.maze, 'num_exits': self.num_exits, 'colors_dict': self.colors_dict,
+                'start_location_index': self.start_location_index, 'location_index': self.robot.location_index,
+                'goal_indexes': self.goal_indexes, 'fuel_left': self.robot.fuel_left, 'step': self.robot.step,
+                'reward': self.reward}
+
+    @classmethod
+    def from_schema(cls, fields):
+        env = cls(colors_dict=fields['colors_dict'], num_exits=fields['num_exits'], maze=fields['maze'])
+        env.set_episode(fields)
+        return env
+
+    def set_episode(self, fields):
+        """continue the episode of the fields of to_schema"""
+        self.start_location_index = fields['start_location_index']
+        self.robot = Robot(self.index_to_coordinate(fields['location_index']), fields['location_index'])
+        self.robot.fuel_left = fields['fuel_left']
+        self.robot.step = fields['step']
+        self.location_index = self.robot.location_index
+        self.reward = fields['reward']
+        self.set_goals(fields['goal_indexes'])
+        self.goal_location_index = self.goal_indexes.tolist() if self.num_exits > 1 else int(self.goal_indexes[0])
+        self.goal_location = self.index_to_coordinate(self.goal_location_index)
+        if self.maze_plot is not None:
+            self.init_enter_exit_on_canvas()
+
     def to_JSON(self, task_path=None):
+        """
+        compact JSON of the env (see to_schema), returned, or saved to task_path as VoronoiWorld.json with the
+        arrays in VoronoiWorld.npz; Utils.io.load or loads build the env back
+        """
         if task_path is not None:
             if not os.path.exists(task_path):
                 os.makedirs(task_path)
-            with open(os.path.join(task_path, 'VoronoiWorld.json'), 'w') as f:
-                # json.dump(self, f)
-                json.dump(self, f, default=sterilize, sort_keys=True, indent=4)
+            io.save(self, os.path.join(task_path, 'VoronoiWorld.json'))
         else:
-            return json.dumps(self, default=sterilize,
-                              sort_keys=True, indent=4)
+            return io.dumps(self)
 
     # def save_as_JSON(self, task_path='VornoidWorld'):
     #     if not os.path.exists(task_path):
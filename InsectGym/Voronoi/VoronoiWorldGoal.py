@@ -8,13 +8,25 @@ from InsectGym.Voronoi.voronoi_maze_plots import VoronoiMazePlot
 from InsectGym.Voronoi.VoronoiWorld import VoronoiWorld, Robot
 font = cv2.FONT_HERSHEY_COMPLEX_SMALL
 
+
+def goal_reached(achieved_goal, desired_goal):
+    """compare achieved goals against desired goals, either of which can be batched;
+    desired goals with one more dimension than the achieved goals hold several goals each"""
+    achieved_goal = np.asarray(achieved_goal)
+    desired_goal = np.asarray(desired_goal)
+    if desired_goal.ndim > achieved_goal.ndim:
+        return np.any(desired_goal == achieved_goal[..., None], axis=-1)
+    return achieved_goal == desired_goal
+
+
 class VoronoiWorldGoal(VoronoiWorld, GoalEnv):
     def __init__(self, colors_dict=None, multi_route_prob=0.1, plot_path=None, task_path=None,
-                 random_start=False, num_goals=1):
+                 random_start=False, num_goals=1, maze=None):
         # super(VoronoiWorldTarget, self).__init__(colors_dict=colors_dict, multi_route_prob=multi_route_prob)
         self.random_start = random_start
         super(VoronoiWorldGoal, self).__init__(colors_dict=colors_dict, multi_route_prob=multi_route_prob,
-                                               plot_path=plot_path, task_path=task_path, num_exits=num_goals)
+                                               plot_path=plot_path, task_path=task_path, num_exits=num_goals,
+                                               maze=maze)
         # self.width = 100
         # self.height = 100
         # self.maze = VoronoiMaze(width=self.width, height=self.height, multi_route_prob=multi_route_prob)
@@ -71,7 +83,7 @@ class VoronoiWorldGoal(VoronoiWorld, GoalEnv):
         # If out of fuel, end the episode.
         if self.robot.fuel_left == 0:
             done = True
-        if np.any(self.robot.location_index == self.goal_location_index):
+        if self.goal_mask[self.robot.location_index]:
             done = True
         obs = {
             'observation': self.robot.location_index,
@@ -82,14 +94,29 @@ class VoronoiWorldGoal(VoronoiWorld, GoalEnv):
         self.reward = self.compute_reward(self.robot.location_index, self.goal_location_index, state)
         return obs, self.reward, done, state
 
+    def to_schema(self):
+        fields = super(VoronoiWorldGoal, self).to_schema()
+        fields['random_start'] = self.random_start
+        return fields
+
+    @classmethod
+    def from_schema(cls, fields):
+        env = cls(colors_dict=fields['colors_dict'], random_start=fields['random_start'],
+                  num_goals=fields['num_exits'], maze=fields['maze'])
+        env.set_episode(fields)
+        return env
+
     def compute_reward(self, achieved_goal, desired_goal, info):
-        # Reward for executing a step.
-        reward = -1
-        if len(self.maze.path_graph[info['robot_location']]) <= info['actual_action']:
-            self.reward -= 0  # no punishment to hit the wall for now.
-        if np.any(achieved_goal == desired_goal):
-            reward += 20
-        return reward
+        # Reward for executing a step, no punishment to hit the wall for now.
+        if np.array_equal(desired_goal, self.goal_location_index):
+            # the current goals of the env, passed back or copied (e.g. from a replay buffer), are looked up in the
+            # goal mask
+            reached = self.goal_mask[achieved_goal]
+        else:
+            reached = goal_reached(achieved_goal, desired_goal)
+        if np.ndim(reached) == 0:
+            return -1 + 20 * int(reached)
+        return -1 + 20 * reached.astype(int)
 
     def reset(self):
         if self.random_start:
@@ -103,12 +130,14 @@ class VoronoiWorldGoal(VoronoiWorld, GoalEnv):
                            location_index=self.start_location_index)
 
         self.goal_location_index = np.random.choice(len(self.locations), self.num_exits).tolist()
+        self.set_goals(self.goal_location_index)
         if self.num_exits == 1:
             self.goal_location_index = self.goal_location_index[0]
         self.goal_location = self.index_to_coordinate(self.goal_location_index)
         self.reward = 0
-        self.init_enter_exit_on_canvas()
-        self.draw_location_on_canvas()
+        if self.maze_plot is not None:
+            self.init_enter_exit_on_canvas()
+            self.draw_location_on_canvas()
         # return the observation
         obs = {
             'observation': self.robot.location_index,
@@ -1,5 +1,6 @@
 import random
 import math
+import numpy as np
 from scipy.spatial import Voronoi
 from InsectGym.Utils.Geometry import BoundingBoxIntercepts
 from InsectGym.Utils.PoissonDiskSampling import poisson_disk_sampling
@@ -15,8 +16,14 @@ TODO - clean up code, probably find a better solution to clipping the Voronoi di
 
 
 class VoronoiGraph:
-    def __init__(self, width, height):
-        self.points = poisson_disk_sampling(width - 1, height - 1)
+    def __init__(self, width, height, points=None):
+        """a diagram of random seed points, or of the given points (see to_schema)"""
+        self.width = width
+        self.height = height
+        if points is None:
+            self.points = poisson_disk_sampling(width - 1, height - 1)
+        else:
+            self.points = [tuple(point) for point in points]
         # adding these points - see stackoverflow link
         self.points.extend([(999, 999), (-999, 999), (999, -999), (-999, -999)])
         self.vor = Voronoi(self.points)
@@ -37,6 +44,14 @@ class VoronoiGraph:
         self.new_nodes = set()
         self.top_edges, self.bottom_edges, self.right_edges, self.left_edges = self.filter_voronoi_edges_in_bounds()
 
+    def to_schema(self):
+        """the diagram is defined by its seed points, everything else is computed from them"""
+        return {'width': self.width, 'height': self.height, 'points': np.array(self.points)}
+
+    @classmethod
+    def from_schema(cls, fields):
+        return cls(fields['width'], fields['height'], fields['points'].tolist())
+
     def get_voronoi_edges(self):
         """returns vertices and edges making up voronoi cells"""
         edges = set()
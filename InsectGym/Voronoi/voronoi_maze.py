@@ -22,12 +22,16 @@ def length(line):
     return np.sqrt(np.sum((np.array(line[0])-np.array(line[1]))**2))
 
 class VoronoiMaze:
-    def __init__(self, width=100, height=100, multi_route_prob=0):
-        self.voronoi = VoronoiGraph(width, height)
+    def __init__(self, width=100, height=100, multi_route_prob=0, voronoi=None, paths=None):
+        """a random maze, or the maze of a given VoronoiGraph and paths array (see to_schema)"""
+        self.voronoi = VoronoiGraph(width, height) if voronoi is None else voronoi
         self.graph = self.voronoi.cells
         self.path_graph = {}
-        self.edges_to_remove, self.legal_maze_path_edges = \
-            self.generate_maze(multi_route_prob=multi_route_prob)
+        if paths is None:
+            self.edges_to_remove, self.legal_maze_path_edges = \
+                self.generate_maze(multi_route_prob=multi_route_prob)
+        else:
+            self.edges_to_remove, self.legal_maze_path_edges = self.open_paths(paths)
         self.max_viable_neighbours = max_neighbour_num(self.path_graph)
         self.voronoi.draw_right_edges()
         self.voronoi.draw_left_edges()
@@ -80,6 +84,41 @@ class VoronoiMaze:
                             self.add_path_to_graph(key, n2)
         return edges_to_remove, legal_traversal_edges
 
+    def open_paths(self, paths):
+        """
+        add the passages of a paths array (see to_schema) to path_graph, and return the edges to remove and the
+        legal edges as generate_maze does
+        """
+        points = self.voronoi.points
+        edges_to_remove = []
+        legal_traversal_edges = {}
+        for index, neighbours in enumerate(paths.tolist()):
+            for neighbour in neighbours:
+                if neighbour < 0:
+                    break
+                pair = (points[index], points[neighbour])
+                self.path_graph.setdefault(pair[0], []).append(pair[1])
+                legal_traversal_edges[pair] = True
+                if index < neighbour:
+                    edges_to_remove.append(self.voronoi.point_pairs_separating_edges[pair])
+        return edges_to_remove, legal_traversal_edges
+
+    def to_schema(self):
+        """
+        the maze is defined by its diagram and its passages: for each seed point, the indexes of the neighbours in
+        its path_graph list, in order (the actions of VoronoiWorld follow it) and padded with -1
+        """
+        indexes = {point: index for index, point in enumerate(self.voronoi.points)}
+        paths = np.full((len(self.voronoi.points), max(self.max_viable_neighbours, 1)), -1)
+        for point, neighbours in self.path_graph.items():
+            paths[indexes[point], :len(neighbours)] = [indexes[a_neighbour] for a_neighbour in neighbours]
+        return {'voronoi': self.voronoi, 'paths': paths}
+
+    @classmethod
+    def from_schema(cls, fields):
+        voronoi = fields['voronoi']
+        return cls(voronoi.width, voronoi.height, voronoi=voronoi, paths=fields['paths'])
+
     def get_enter_exit_locations(self):
         """get enter and exit locations from edge points"""
         # just using first and last point for now because random points were often too close
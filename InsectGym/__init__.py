@@ -33,4 +33,25 @@ register(
      id='MaggotInPetriDish-v1',
      entry_point='InsectGym.MaggotInPetriDish.MaggotInPetriDish:MaggotInPetriDishEnv',
      max_episode_steps=10000
- )
\ No newline at end of file
+ )
+
+register(
+     id='MultiPassengerTaxiMap-v1',
+     entry_point='InsectGym.MultiPassengerTaxi.MultiPassengerTaxiMap:MultiPassengerTaxiMapEnv',
+     max_episode_steps=10000
+ )
+
+register(
+     id='ContinuousPetriDish-v1',
+     entry_point='InsectGym.MaggotInPetriDish.ContinuousPetriDish:ContinuousPetriDishEnv',
+     max_episode_steps=10000
+ )
+
+# native batched implementations for make_vec
+from InsectGym.vector import make_vec, register_vec
+register_vec('ChopperScape-v1', 'InsectGym.ChopperScape.ChopperScapeVec:ChopperScapeVec')
+register_vec('MultiPassengerTaxi-v1', 'InsectGym.Tabular.TabularVecEnv:TabularVecEnv')
+register_vec('MultiPassengerTaxiPick-v1', 'InsectGym.Tabular.TabularVecEnv:TabularVecEnv')
+register_vec('MaggotInPetriDish-v1', 'InsectGym.Tabular.TabularVecEnv:TabularVecEnv')
+register_vec('MultiPassengerTaxiMap-v1', 'InsectGym.Tabular.TabularVecEnv:TabularVecEnv')
+register_vec('VoronoiWorld-v1', 'InsectGym.Tabular.TabularVecEnv:TabularVecEnv')
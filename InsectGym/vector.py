@@ -0,0 +1,91 @@
+import random
+import numpy as np
+import gym
+from gym.envs.registration import load
+from gym.vector import AsyncVectorEnv, SyncVectorEnv
+
+"""
+make_vec, the batched counterpart of gym.make for the InsectGym envs.
+
+The envs with a native batched implementation, registered with register_vec, are stepped as stacked arrays in the
+calling process. The others run as copies of the gym.make env, either in subprocesses exchanging observations
+through shared memory (AsyncVectorEnv) or one after the other in the calling process (SyncVectorEnv). As these
+reset the copies that are done in the same step, each copy adds the last observation of an episode to the info of
+its last step, as 'terminal_observation'. The data that does not change over the episodes, such as the maze of the
+Voronoi envs, is built once and shared by all copies instead of being generated again for each of them.
+"""
+
+# env id -> entry point of the native batched implementation, a class with a from_spec(spec, num_envs, seed,
+# **kwargs) constructor
+native_vec_envs = {}
+
+# env ids of the Voronoi envs, whose copies share one maze
+voronoi_env_ids = ('VoronoiWorld-v1', 'VoronoiWorldGoal-v1')
+
+
+def register_vec(env_id, entry_point):
+    """register the native batched implementation of the env env_id"""
+    native_vec_envs[env_id] = entry_point
+
+
+def shared_kwargs(env_id, kwargs):
+    """kwargs completed with the immutable data of env_id, built once to be passed to every copy"""
+    if env_id in voronoi_env_ids and kwargs.get('maze') is None:
+        from InsectGym.Voronoi.VoronoiWorld import make_maze
+        num_exits = kwargs.get('num_exits', kwargs.get('num_goals', 1))
+        kwargs = dict(kwargs, maze=make_maze(num_exits, kwargs.get('multi_route_prob', 0.1)))
+    return kwargs
+
+
+class TerminalObservation(gym.Wrapper):
+    """adds the last observation of an episode to the info of its last step, as 'terminal_observation'"""
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        if done:
+            info = dict(info, terminal_observation=obs)
+        return obs, reward, done, info
+
+
+def seeded_env_fn(env_id, kwargs, seed):
+    """
+    a function making env_id with kwargs after seeding the random and np.random generators of its process with
+    seed, or with fresh entropy if seed is None, so that forked copies do not draw the same numbers
+    """
+    def make_env():
+        random.seed(seed)
+        np.random.seed(seed)
+        return TerminalObservation(gym.make(env_id, **kwargs))
+    return make_env
+
+
+def make_vec(env_id, num_envs, mode='auto', seed=None, **kwargs):
+    """
+    num_envs copies of the env env_id made with kwargs, as a gym VectorEnv, with the time limit of its registration.
+    mode is one of
+        -'native': the native batched implementation, for the env ids in native_vec_envs
+        -'subproc': an AsyncVectorEnv of copies in subprocesses, with the observations in shared memory
+        -'sync': a SyncVectorEnv of copies in the calling process
+        -'auto': 'native' if env_id has a native implementation, else 'subproc' for more than one copy, else 'sync'
+    For 'native', kwargs are the arguments of the native implementation (e.g. the obs_mode of ChopperScapeVec).
+    """
+    assert mode in ['auto', 'native', 'subproc', 'sync'], "Invalid mode, must be 'auto', 'native', 'subproc' or 'sync'"
+    if mode == 'auto':
+        if env_id in native_vec_envs:
+            mode = 'native'
+        else:
+            mode = 'subproc' if num_envs > 1 else 'sync'
+    spec = gym.spec(env_id)
+    if mode == 'native':
+        assert env_id in native_vec_envs, str(env_id) + " has no native batched implementation"
+        return load(native_vec_envs[env_id]).from_spec(spec, num_envs, seed=seed, **kwargs)
+
+    kwargs = shared_kwargs(env_id, kwargs)
+    if mode == 'subproc':
+        env_fns = [seeded_env_fn(env_id, kwargs, None if seed is None else seed + i) for i in range(num_envs)]
+        envs = AsyncVectorEnv(env_fns, shared_memory=True)
+    else:
+        envs = SyncVectorEnv([lambda: TerminalObservation(gym.make(env_id, **kwargs))] * num_envs)
+    if seed is not None:
+        envs.seed(seed)
+    return envs
@@ -1,7 +1,9 @@
-from setuptools import setup
+from setuptools import setup, find_packages
 
 setup(name='InsectGym',
       version='0.0.1',
+      packages=find_packages(),
+      package_data={'InsectGym.ChopperScape': ['*.png']},
       install_requires=['gym',
                         'numpy',
                         'opencv-python',